@@ -51,10 +51,6 @@ def upgrade() -> None:
         ),
         sa.UniqueConstraint("process_key"),
     )
-    op.create_index("ix_processes_tc_numero", "processes", ["tc_numero"], unique=False)
-    op.create_index("ix_processes_ano", "processes", ["ano"], unique=False)
-    op.create_index("ix_processes_interessado", "processes", ["interessado"], unique=False)
-    op.create_index("ix_processes_assunto", "processes", ["assunto"], unique=False)
 
     op.create_table(
         "ficha_templates",
@@ -91,9 +87,6 @@ def upgrade() -> None:
         sa.ForeignKeyConstraint(["process_id"], ["processes.id"], ondelete="CASCADE"),
         sa.ForeignKeyConstraint(["template_id"], ["ficha_templates.id"], ondelete="RESTRICT"),
     )
-    op.create_index("ix_fichas_process_id", "fichas", ["process_id"], unique=False)
-    op.create_index("ix_fichas_template_id", "fichas", ["template_id"], unique=False)
-    op.create_index("ix_fichas_indexador", "fichas", ["indexador"], unique=False)
 
     op.create_table(
         "attachments",
@@ -124,15 +117,8 @@ def upgrade() -> None:
 def downgrade() -> None:
     op.drop_table("audit_logs")
     op.drop_table("attachments")
-    op.drop_index("ix_fichas_indexador", table_name="fichas")
-    op.drop_index("ix_fichas_template_id", table_name="fichas")
-    op.drop_index("ix_fichas_process_id", table_name="fichas")
     op.drop_table("fichas")
     op.drop_table("ficha_templates")
-    op.drop_index("ix_processes_assunto", table_name="processes")
-    op.drop_index("ix_processes_interessado", table_name="processes")
-    op.drop_index("ix_processes_ano", table_name="processes")
-    op.drop_index("ix_processes_tc_numero", table_name="processes")
     op.drop_table("processes")
     op.drop_index("ix_users_email", table_name="users")
     op.drop_table("users")
@@ -0,0 +1,44 @@
+"""post seed secondary indexes
+
+Revision ID: 0004_post_seed_indexes
+Revises: 0003_ocr_jobs
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+
+
+revision = "0004_post_seed_indexes"
+down_revision = "0003_ocr_jobs"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ("ix_processes_tc_numero", "processes", ["tc_numero"]),
+    ("ix_processes_ano", "processes", ["ano"]),
+    ("ix_processes_interessado", "processes", ["interessado"]),
+    ("ix_processes_assunto", "processes", ["assunto"]),
+    ("ix_fichas_process_id", "fichas", ["process_id"]),
+    ("ix_fichas_template_id", "fichas", ["template_id"]),
+    ("ix_fichas_indexador", "fichas", ["indexador"]),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
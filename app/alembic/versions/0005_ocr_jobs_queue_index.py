@@ -0,0 +1,42 @@
+"""partial index for active ocr jobs
+
+Revision ID: 0005_ocr_jobs_queue_index
+Revises: 0004_post_seed_indexes
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_ocr_jobs_queue_index"
+down_revision = "0004_post_seed_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_ocr_jobs_queue",
+            "ocr_jobs",
+            ["status", "created_at"],
+            unique=False,
+            if_not_exists=True,
+            postgresql_where=sa.text("status IN ('queued', 'processing')"),
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_ocr_jobs_status", table_name="ocr_jobs", if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_ocr_jobs_status",
+            "ocr_jobs",
+            ["status"],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_ocr_jobs_queue", table_name="ocr_jobs", if_exists=True, postgresql_concurrently=True)
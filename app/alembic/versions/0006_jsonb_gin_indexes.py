@@ -0,0 +1,42 @@
+"""gin indexes on jsonb payloads
+
+Revision ID: 0006_jsonb_gin_indexes
+Revises: 0005_ocr_jobs_queue_index
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+
+
+revision = "0006_jsonb_gin_indexes"
+down_revision = "0005_ocr_jobs_queue_index"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ("ix_fichas_campos_base_gin", "fichas", "campos_base_json"),
+    ("ix_fichas_extras_gin", "fichas", "extras_json"),
+    ("ix_ocr_jobs_field_suggestions_gin", "ocr_jobs", "field_suggestions_json"),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name,
+                table,
+                [column],
+                unique=False,
+                if_not_exists=True,
+                postgresql_using="gin",
+                postgresql_ops={column: "jsonb_path_ops"},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,27 @@
+"""users token version
+
+Revision ID: 0007_users_token_version
+Revises: 0006_jsonb_gin_indexes
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_users_token_version"
+down_revision = "0006_jsonb_gin_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.alter_column("users", "token_version", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("users", "token_version")
@@ -0,0 +1,42 @@
+"""covering index for fichas by process
+
+Revision ID: 0008_fichas_process_covering
+Revises: 0007_users_token_version
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+
+
+revision = "0008_fichas_process_covering"
+down_revision = "0007_users_token_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_fichas_process_covering",
+            "fichas",
+            ["process_id", "status"],
+            unique=False,
+            if_not_exists=True,
+            postgresql_include=["template_id", "indexador", "updated_at"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_fichas_process_id", table_name="fichas", if_exists=True, postgresql_concurrently=True)
+        op.execute("VACUUM ANALYZE fichas")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_fichas_process_id",
+            "fichas",
+            ["process_id"],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_fichas_process_covering", table_name="fichas", if_exists=True, postgresql_concurrently=True)
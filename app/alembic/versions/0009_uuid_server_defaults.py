@@ -0,0 +1,38 @@
+"""server side uuid defaults
+
+Revision ID: 0009_uuid_server_defaults
+Revises: 0008_fichas_process_covering
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009_uuid_server_defaults"
+down_revision = "0008_fichas_process_covering"
+branch_labels = None
+depends_on = None
+
+
+TABLES = (
+    "users",
+    "processes",
+    "ficha_templates",
+    "fichas",
+    "attachments",
+    "audit_logs",
+    "uploaded_documents",
+    "ocr_jobs",
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+    for table in TABLES:
+        op.alter_column(table, "id", server_default=sa.text("gen_random_uuid()"))
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.alter_column(table, "id", server_default=None)
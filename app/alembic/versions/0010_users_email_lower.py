@@ -0,0 +1,63 @@
+"""case insensitive users email index
+
+Revision ID: 0010_users_email_lower
+Revises: 0009_uuid_server_defaults
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010_users_email_lower"
+down_revision = "0009_uuid_server_defaults"
+branch_labels = None
+depends_on = None
+
+
+def _check_lowercase_duplicates() -> None:
+    if op.get_context().as_sql:
+        return
+    duplicates = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT lower(email) AS email, count(*) AS total FROM users "
+                "GROUP BY lower(email) HAVING count(*) > 1 ORDER BY lower(email)"
+            )
+        )
+        .all()
+    )
+    if duplicates:
+        listed = ", ".join(f"{row.email} ({row.total})" for row in duplicates)
+        raise RuntimeError(
+            "Emails duplicados ignorando maiusculas/minusculas; unifique os usuarios antes de migrar: " + listed
+        )
+
+
+def upgrade() -> None:
+    _check_lowercase_duplicates()
+    op.execute("UPDATE users SET email = lower(email) WHERE email <> lower(email)")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_email_lower",
+            "users",
+            [sa.text("lower(email)")],
+            unique=True,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_users_email", table_name="users", if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_email",
+            "users",
+            ["email"],
+            unique=True,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_users_email_lower", table_name="users", if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+"""keyset pagination indexes
+
+Revision ID: 0011_keyset_pagination_indexes
+Revises: 0010_users_email_lower
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011_keyset_pagination_indexes"
+down_revision = "0010_users_email_lower"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in ("processes", "fichas"):
+            op.create_index(
+                f"ix_{table}_created_id",
+                table,
+                [sa.text("created_at DESC"), sa.text("id DESC")],
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in ("processes", "fichas"):
+            op.drop_index(f"ix_{table}_created_id", table_name=table, if_exists=True, postgresql_concurrently=True)
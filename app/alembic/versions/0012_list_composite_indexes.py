@@ -0,0 +1,65 @@
+"""composite indexes for list filters
+
+Revision ID: 0012_list_composite_indexes
+Revises: 0011_keyset_pagination_indexes
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012_list_composite_indexes"
+down_revision = "0011_keyset_pagination_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_fichas_template_status_created",
+            "fichas",
+            ["template_id", "status", sa.text("created_at DESC"), sa.text("id DESC")],
+            unique=False,
+            if_not_exists=True,
+            postgresql_include=["indexador", "process_id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_fichas_template_id", table_name="fichas", if_exists=True, postgresql_concurrently=True)
+        op.create_index(
+            "ix_processes_ano_created",
+            "processes",
+            ["ano", sa.text("created_at DESC"), sa.text("id DESC")],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_processes_ano", table_name="processes", if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_processes_ano",
+            "processes",
+            ["ano"],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_processes_ano_created", table_name="processes", if_exists=True, postgresql_concurrently=True)
+        op.create_index(
+            "ix_fichas_template_id",
+            "fichas",
+            ["template_id"],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_fichas_template_status_created",
+            table_name="fichas",
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,27 @@
+"""check constraint for ocr job status
+
+Revision ID: 0013_ocr_jobs_status_check
+Revises: 0012_list_composite_indexes
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+
+
+revision = "0013_ocr_jobs_status_check"
+down_revision = "0012_list_composite_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE ocr_jobs ADD CONSTRAINT ck_ocr_jobs_status "
+        "CHECK (status IN ('queued', 'processing', 'done', 'failed')) NOT VALID"
+    )
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE ocr_jobs VALIDATE CONSTRAINT ck_ocr_jobs_status")
+
+
+def downgrade() -> None:
+    op.drop_constraint("ck_ocr_jobs_status", "ocr_jobs", type_="check")
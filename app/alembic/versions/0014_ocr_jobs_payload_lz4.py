@@ -0,0 +1,27 @@
+"""lz4 compression for ocr job payloads
+
+Revision ID: 0014_ocr_jobs_payload_lz4
+Revises: 0013_ocr_jobs_status_check
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+
+
+revision = "0014_ocr_jobs_payload_lz4"
+down_revision = "0013_ocr_jobs_status_check"
+branch_labels = None
+depends_on = None
+
+PAYLOAD_COLUMNS = ("extracted_text", "ocr_raw_json")
+
+
+def upgrade() -> None:
+    for column in PAYLOAD_COLUMNS:
+        op.execute(f"ALTER TABLE ocr_jobs ALTER COLUMN {column} SET STORAGE EXTENDED")
+        op.execute(f"ALTER TABLE ocr_jobs ALTER COLUMN {column} SET COMPRESSION lz4")
+
+
+def downgrade() -> None:
+    for column in PAYLOAD_COLUMNS:
+        op.execute(f"ALTER TABLE ocr_jobs ALTER COLUMN {column} SET COMPRESSION pglz")
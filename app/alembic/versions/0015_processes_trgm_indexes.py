@@ -0,0 +1,52 @@
+"""trigram indexes for process text search
+
+Revision ID: 0015_processes_trgm_indexes
+Revises: 0014_ocr_jobs_payload_lz4
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+
+
+revision = "0015_processes_trgm_indexes"
+down_revision = "0014_ocr_jobs_payload_lz4"
+branch_labels = None
+depends_on = None
+
+TRGM_COLUMNS = ("interessado", "assunto")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for column in TRGM_COLUMNS:
+            op.create_index(
+                f"ix_processes_{column}_trgm",
+                "processes",
+                [column],
+                unique=False,
+                if_not_exists=True,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+            )
+            op.drop_index(f"ix_processes_{column}", table_name="processes", if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in TRGM_COLUMNS:
+            op.create_index(
+                f"ix_processes_{column}",
+                "processes",
+                [column],
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+            op.drop_index(
+                f"ix_processes_{column}_trgm",
+                table_name="processes",
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
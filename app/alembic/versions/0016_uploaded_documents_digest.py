@@ -0,0 +1,25 @@
+"""uploaded documents size and digest
+
+Revision ID: 0016_uploaded_documents_digest
+Revises: 0015_processes_trgm_indexes
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0016_uploaded_documents_digest"
+down_revision = "0015_processes_trgm_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("uploaded_documents", sa.Column("size", sa.BigInteger(), nullable=True))
+    op.add_column("uploaded_documents", sa.Column("sha256", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("uploaded_documents", "sha256")
+    op.drop_column("uploaded_documents", "size")
@@ -1,36 +1,39 @@
 from __future__ import annotations
 
-import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import orjson
+
 root = Path(__file__).resolve().parents[1]
 sys.path.append(str(root / "src"))
 
-from sqlalchemy import select
-
 from fichas.auth import get_password_hash
-from fichas.db import SessionLocal
-from fichas.models import FichaTemplate, User
+from fichas.db import SessionLocal, insert_or_ignore
+from fichas.models import FichaTemplate, User, uuid7
 from fichas.settings import settings
-from fichas.services.templates_service import import_template_payload
+from fichas.services.templates_service import import_template_payloads
+
+DRAFT_READ_WORKERS = 8
 
 
 def seed_admin(db):
-    user = db.execute(select(User).where(User.email == settings.ADMIN_SEED_EMAIL)).scalar_one_or_none()
-    if not user:
-        user = User(
-            email=settings.ADMIN_SEED_EMAIL,
+    stmt = (
+        insert_or_ignore(db, User.__table__, ["email"])
+        .values(
+            id=uuid7(),
+            email=settings.ADMIN_SEED_EMAIL.strip().lower(),
             hashed_password=get_password_hash(settings.ADMIN_SEED_PASSWORD),
             is_admin=True,
             is_active=True,
         )
-        db.add(user)
-        db.commit()
-        print("Admin criado.")
-    else:
-        print("Admin ja existe.")
+        .returning(User.__table__.c.id)
+    )
+    created = db.execute(stmt).first()
+    db.commit()
+    print("Admin criado." if created else "Admin ja existe.")
 
 
 def seed_templates(db):
@@ -82,22 +85,39 @@ def seed_templates(db):
         },
     ]
 
+    table = FichaTemplate.__table__
+    stmt = (
+        insert_or_ignore(db, table, ["nome", "versao"])
+        .values(
+            [
+                {
+                    "id": uuid7(),
+                    "nome": item["nome"],
+                    "descricao": item["descricao"],
+                    "schema_json": item["schema_json"],
+                    "versao": item["versao"],
+                    "origem_pdf": item["origem_pdf"],
+                    "is_active": True,
+                }
+                for item in templates
+            ]
+        )
+        .returning(table.c.nome)
+    )
+    created = set(db.execute(stmt).scalars().all())
+    db.commit()
     for item in templates:
-        exists = db.execute(select(FichaTemplate).where(FichaTemplate.nome == item["nome"])).scalar_one_or_none()
-        if exists:
+        if item["nome"] in created:
+            print(f"Template {item['nome']} criado.")
+        else:
             print(f"Template {item['nome']} ja existe.")
-            continue
-        template = FichaTemplate(
-            nome=item["nome"],
-            descricao=item["descricao"],
-            schema_json=item["schema_json"],
-            versao=item["versao"],
-            origem_pdf=item["origem_pdf"],
-            is_active=True,
-        )
-        db.add(template)
-        db.commit()
-        print(f"Template {item['nome']} criado.")
+
+
+def _read_draft(draft_path: Path):
+    try:
+        return orjson.loads(draft_path.read_bytes())
+    except orjson.JSONDecodeError:
+        return None
 
 
 def seed_draft_templates(db):
@@ -109,13 +129,19 @@ def seed_draft_templates(db):
         print("templates_draft nao encontrado.")
         return
 
-    for draft_path in sorted(drafts_dir.glob("*.json")):
-        try:
-            payload = json.loads(draft_path.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
+    draft_paths = sorted(drafts_dir.glob("*.json"))
+    with ThreadPoolExecutor(max_workers=DRAFT_READ_WORKERS) as executor:
+        parsed = list(executor.map(_read_draft, draft_paths))
+
+    drafts = []
+    for draft_path, payload in zip(draft_paths, parsed):
+        if payload is None:
             print(f"Draft invalido: {draft_path.name}")
             continue
-        template, created = import_template_payload(db, payload, user=None)
+        drafts.append((draft_path, payload))
+
+    results = import_template_payloads(db, [payload for _, payload in drafts], user=None)
+    for (draft_path, _), (template, created) in zip(drafts, results):
         status = "importado" if created else "ja existe"
         print(f"Draft {draft_path.name}: {template.nome} v{template.versao} ({status})")
 
@@ -1,31 +1,58 @@
 from __future__ import annotations
 
+import logging
+import queue
+import threading
+import time
 import uuid
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Any
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable
 
+from sqlalchemy import event, insert, text
 from sqlalchemy.orm import Session
 
-from fichas.models import AuditLog, User
+from fichas.db import SessionLocal, copy_rows, is_postgres, json_dumps, supports_copy
+from fichas.models import AuditLog, User, uuid7
+from fichas.settings import settings
+
+logger = logging.getLogger(__name__)
+
+AUDIT_BUFFER_KEY = "_audit_buffer"
+AUDIT_DEFERRED_KEY = "_audit_deferred"
+AUDIT_COPY_THRESHOLD = 100
+AUDIT_COPY_COLUMNS = ("id", "user_id", "action", "entity", "entity_id", "before_json", "after_json")
+
+
+_NORMALIZERS: dict[type, Callable[[Any], Any]] = {
+    uuid.UUID: str,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    Decimal: float,
+}
 
 
 def _normalize_value(value: Any) -> Any:
-    if isinstance(value, uuid.UUID):
-        return str(value)
-    if isinstance(value, (datetime, date)):
-        return value.isoformat()
-    if isinstance(value, Decimal):
-        return float(value)
-    return value
+    normalizer = _NORMALIZERS.get(type(value))
+    if normalizer is None:
+        return value
+    return normalizer(value)
+
+
+@lru_cache(maxsize=None)
+def _columns_for(model_cls) -> tuple[tuple[str, ...], Callable[[Any], Any]]:
+    names = tuple(column.name for column in model_cls.__table__.columns)
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return names, lambda model: (getter(model),)
+    return names, getter
 
 
 def model_to_dict(model) -> dict[str, Any]:
-    data: dict[str, Any] = {}
-    for column in model.__table__.columns:
-        value = getattr(model, column.name)
-        data[column.name] = _normalize_value(value)
-    return data
+    names, getter = _columns_for(type(model))
+    return {name: _normalize_value(value) for name, value in zip(names, getter(model))}
 
 
 def log_action(
@@ -36,13 +63,163 @@ def log_action(
     entity_id: str,
     before: dict[str, Any] | None,
     after: dict[str, Any] | None,
+    durable: bool = False,
 ) -> None:
-    entry = AuditLog(
-        user_id=user.id if user else None,
-        action=action,
-        entity=entity,
-        entity_id=entity_id,
-        before_json=before,
-        after_json=after,
+    if not db.in_transaction():
+        db.begin()
+    key = AUDIT_DEFERRED_KEY if settings.AUDIT_BACKGROUND_WRITES and not durable else AUDIT_BUFFER_KEY
+    db.info.setdefault(key, []).append(
+        {
+            "id": uuid7(),
+            "user_id": user.id if user else None,
+            "action": action,
+            "entity": entity,
+            "entity_id": entity_id,
+            "before_json": before,
+            "after_json": after,
+        }
     )
-    db.add(entry)
+
+
+def _dump_json(value: dict[str, Any] | None) -> str | None:
+    if value is None:
+        return None
+    return json_dumps(value)
+
+
+def _write_entries(db: Session, entries: list[dict[str, Any]]) -> None:
+    if len(entries) >= AUDIT_COPY_THRESHOLD and supports_copy(db):
+        copy_rows(
+            db,
+            AuditLog.__tablename__,
+            AUDIT_COPY_COLUMNS,
+            (
+                (
+                    entry["id"],
+                    entry["user_id"],
+                    entry["action"],
+                    entry["entity"],
+                    entry["entity_id"],
+                    _dump_json(entry["before_json"]),
+                    _dump_json(entry["after_json"]),
+                )
+                for entry in entries
+            ),
+        )
+        return
+    db.execute(insert(AuditLog.__table__).values(entries))
+
+
+def flush_audit_buffer(db: Session) -> None:
+    entries = db.info.pop(AUDIT_BUFFER_KEY, None)
+    if entries:
+        _write_entries(db, entries)
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        interval: float = 0.2,
+        batch_size: int = 500,
+        max_attempts: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, entries: list[dict[str, Any]]) -> None:
+        for entry in entries:
+            self._queue.put(entry)
+        self._ensure_started()
+
+    def drain(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> list[dict[str, Any]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, entries: list[dict[str, Any]]) -> None:
+        with self.session_factory() as db:
+            if is_postgres(db):
+                db.execute(text("SET LOCAL synchronous_commit = off"))
+            _write_entries(db, entries)
+            db.commit()
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> None:
+        for attempt in range(self.max_attempts):
+            try:
+                self._write(batch)
+                return
+            except Exception:
+                logger.warning(
+                    "Falha ao gravar %s registros de auditoria (tentativa %s)", len(batch), attempt + 1, exc_info=True
+                )
+                if attempt + 1 < self.max_attempts:
+                    time.sleep(self.retry_delay * 2**attempt)
+        for entry in batch:
+            try:
+                self._write([entry])
+            except Exception:
+                logger.exception("Registro de auditoria nao gravado: %r", entry)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+audit_writer = AuditWriter()
+
+
+@event.listens_for(Session, "before_commit")
+def _flush_audit_before_commit(session: Session) -> None:
+    flush_audit_buffer(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_deferred_audit(session: Session) -> None:
+    entries = session.info.pop(AUDIT_DEFERRED_KEY, None)
+    if entries:
+        audit_writer.submit(entries)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_audit_after_rollback(session: Session, previous_transaction) -> None:
+    if previous_transaction.nested:
+        return
+    session.info.pop(AUDIT_BUFFER_KEY, None)
+    session.info.pop(AUDIT_DEFERRED_KEY, None)
@@ -1,72 +1,161 @@
 from __future__ import annotations
 
+import time
 import uuid
+from dataclasses import dataclass
 from typing import Optional
 
-from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
-from passlib.context import CryptContext
-from sqlalchemy import select
+import bcrypt
+import jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, Request, status
 
-from fichas.db import get_db
+from fichas.db import get_async_read_db, get_db
 from fichas.models import User
 from fichas.settings import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-serializer = URLSafeTimedSerializer(settings.SECRET_KEY, salt="session")
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
 
 SESSION_COOKIE_NAME = "session"
+_SESSION_COOKIE_MARKER = f"{SESSION_COOKIE_NAME}="
+SESSION_TOKEN_ALGORITHM = "HS256"
+USER_CACHE_MAXSIZE = 10_000
+
+
+@dataclass(frozen=True)
+class UserClaims:
+    id: uuid.UUID
+    is_admin: bool
+    token_version: int
+
+
+_user_cache: TTLCache[str, UserClaims] = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=settings.SESSION_USER_CACHE_TTL_SECONDS)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    if hashed_password.startswith(BCRYPT_PREFIXES):
+        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    try:
+        return password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    if hashed_password.startswith(BCRYPT_PREFIXES):
+        return True
+    return password_hasher.check_needs_rehash(hashed_password)
 
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+    user = db.execute(select(User).where(func.lower(User.email) == email.strip().lower())).scalar_one_or_none()
     if not user or not verify_password(password, user.hashed_password):
         return None
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = get_password_hash(password)
+        db.commit()
     return user
 
 
-def create_session_token(user_id: uuid.UUID) -> str:
-    payload = {"user_id": str(user_id)}
-    return serializer.dumps(payload)
+def create_session_token(user: User) -> str:
+    payload = {
+        "sub": str(user.id),
+        "adm": bool(user.is_admin),
+        "v": user.token_version or 0,
+        "exp": int(time.time()) + settings.SESSION_EXPIRES_SECONDS,
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm=SESSION_TOKEN_ALGORITHM)
 
 
-def decode_session_token(token: str) -> Optional[uuid.UUID]:
+def decode_session_token(token: str) -> Optional[UserClaims]:
     try:
-        payload = serializer.loads(token, max_age=settings.SESSION_EXPIRES_SECONDS)
-    except (BadSignature, SignatureExpired):
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[SESSION_TOKEN_ALGORITHM])
+    except jwt.InvalidTokenError:
         return None
-    raw = payload.get("user_id")
-    if not raw:
+    raw = payload.get("sub")
+    if not raw or not isinstance(raw, str):
         return None
-    return uuid.UUID(str(raw))
+    return UserClaims(
+        id=uuid.UUID(raw),
+        is_admin=bool(payload.get("adm", False)),
+        token_version=int(payload.get("v", 0)),
+    )
+
+
+def _claims_query(claims: UserClaims):
+    return select(User.is_admin, User.token_version).where(User.id == claims.id)
 
 
-def get_current_user_optional(request: Request, db: Session = Depends(get_db)) -> Optional[User]:
-    token = request.cookies.get(SESSION_COOKIE_NAME)
+def _claims_match(row, claims: UserClaims) -> bool:
+    if not row:
+        return False
+    return bool(row.is_admin) == claims.is_admin and row.token_version == claims.token_version
+
+
+def _session_token(request: Request) -> str | None:
+    raw_cookie = request.headers.get("cookie")
+    if not raw_cookie or _SESSION_COOKIE_MARKER not in raw_cookie:
+        return None
+    return request.cookies.get(SESSION_COOKIE_NAME) or None
+
+
+def get_current_user_optional(request: Request, db: Session = Depends(get_db)) -> Optional[UserClaims]:
+    token = _session_token(request)
     if not token:
         return None
-    user_id = decode_session_token(token)
-    if not user_id:
+    cached = _user_cache.get(token)
+    if cached is not None:
+        return cached
+    claims = decode_session_token(token)
+    if not claims or not _claims_match(db.execute(_claims_query(claims)).first(), claims):
+        return None
+    _user_cache[token] = claims
+    return claims
+
+
+async def get_current_user_optional_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+) -> Optional[UserClaims]:
+    token = _session_token(request)
+    if not token:
         return None
-    return db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
+    cached = _user_cache.get(token)
+    if cached is not None:
+        return cached
+    claims = decode_session_token(token)
+    if not claims or not _claims_match((await db.execute(_claims_query(claims))).first(), claims):
+        return None
+    _user_cache[token] = claims
+    return claims
+
+
+def forget_session_token(token: str | None) -> None:
+    if token:
+        _user_cache.pop(token, None)
+
+
+def clear_user_cache() -> None:
+    _user_cache.clear()
 
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
-    user = get_current_user_optional(request, db)
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_read_db)) -> UserClaims:
+    user = await get_current_user_optional_async(request, db)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     return user
 
 
-def require_admin(user: User) -> None:
+def require_admin(user: UserClaims) -> None:
     if not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
@@ -1,34 +1,92 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Any, Iterable, Sequence
+
+import orjson
+from sqlalchemy import Table, create_engine, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, aliased, raiseload, sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from fichas.settings import settings
 
 
-def _build_engine():
+SQLITE_MEMORY_URLS = (
+    "sqlite+pysqlite://",
+    "sqlite://",
+    "sqlite+pysqlite:///:memory:",
+    "sqlite:///:memory:",
+)
+SQLITE_SHARED_MEMORY_URL = "sqlite+pysqlite:///file:fichas?mode=memory&cache=shared&uri=true"
+
+
+def _database_url() -> str:
     url = settings.DATABASE_URL
+    if url in SQLITE_MEMORY_URLS:
+        return SQLITE_SHARED_MEMORY_URL
+    return url
+
+
+def _async_database_url(url: str) -> str:
     if url.startswith("sqlite"):
-        connect_args = {"check_same_thread": False}
-        if url in (
-            "sqlite+pysqlite://",
-            "sqlite://",
-            "sqlite+pysqlite:///:memory:",
-            "sqlite:///:memory:",
-        ):
-            return create_engine(
-                url,
-                connect_args=connect_args,
-                poolclass=StaticPool,
-                future=True,
-            )
-        return create_engine(url, connect_args=connect_args, future=True)
-    return create_engine(url, pool_pre_ping=True, future=True)
+        return "sqlite+aiosqlite" + url[url.index(":") :]
+    return url
+
+
+def json_dumps(value: Any) -> str:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _engine_options(url: str) -> dict[str, Any]:
+    json_options = {"json_serializer": json_dumps, "json_deserializer": orjson.loads}
+    if url.startswith("sqlite"):
+        options: dict[str, Any] = {"connect_args": {"check_same_thread": False}, **json_options}
+        if "mode=memory" in url:
+            options["poolclass"] = StaticPool
+        return options
+    return {
+        **json_options,
+        "pool_pre_ping": True,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_use_lifo": True,
+        "connect_args": {"options": "-c jit=off", "application_name": "fichas"},
+    }
+
+
+def _build_engine():
+    url = _database_url()
+    return create_engine(url, future=True, **_engine_options(url))
+
+
+def _build_async_engine():
+    url = _async_database_url(_database_url())
+    return create_async_engine(url, **_engine_options(url))
+
+
+def _build_async_read_engine(primary):
+    if settings.DATABASE_READ_URL:
+        url = _async_database_url(settings.DATABASE_READ_URL)
+        primary = create_async_engine(url, **_engine_options(url))
+    return primary.execution_options(postgresql_readonly=True)
 
 
 engine = _build_engine()
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+SessionLocal = sessionmaker(
+    bind=engine,
+    autoflush=False,
+    autocommit=False,
+    expire_on_commit=False,
+    future=True,
+)
+
+async_engine = _build_async_engine()
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+async_read_engine = _build_async_read_engine(async_engine)
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
 
 
 def get_db():
@@ -37,3 +95,90 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+def is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def supports_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and not dialect.is_async
+
+
+def copy_rows(db: Session, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> None:
+    raw = db.connection().connection.driver_connection
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    with raw.cursor() as cursor:
+        with cursor.copy(statement) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def insert_or_ignore(db: Session, table: Table, index_elements: Sequence[str]):
+    builder = pg_insert if is_postgres(db) else sqlite_insert
+    return builder(table).on_conflict_do_nothing(index_elements=list(index_elements))
+
+
+def seek_before(model, cursor: tuple[Any, Any]):
+    created_at, row_id = cursor
+    stored = aliased(model)
+    stored_created_at = select(stored.created_at).where(stored.id == row_id).scalar_subquery()
+    return tuple_(model.created_at, model.id) < tuple_(
+        func.coalesce(stored_created_at, literal(created_at, model.created_at.type)),
+        literal(row_id, model.id.type),
+    )
+
+
+def strict_load_options(*options):
+    if settings.FICHAS_RAISELOAD:
+        return (*options, raiseload("*"))
+    return options
+
+
+def count_statement(query):
+    return select(func.count()).select_from(query.subquery())
+
+
+def page_statement(
+    model,
+    query,
+    page: int,
+    page_size: int,
+    after: tuple[Any, Any] | None = None,
+    with_total: bool = False,
+):
+    if with_total:
+        query = query.add_columns(func.count().over())
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if after:
+        query = query.where(seek_before(model, after))
+    else:
+        query = query.offset((page - 1) * page_size)
+    return query.limit(page_size)
+
+
+def page_total(db: Session, query, rows: Sequence[Any], page: int) -> int:
+    if rows:
+        return rows[0][-1]
+    if page <= 1:
+        return 0
+    return db.execute(count_statement(query)).scalar_one()
+
+
+async def page_total_async(db: AsyncSession, query, rows: Sequence[Any], page: int) -> int:
+    if rows:
+        return rows[0][-1]
+    if page <= 1:
+        return 0
+    return (await db.execute(count_statement(query))).scalar_one()
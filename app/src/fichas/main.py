@@ -1,13 +1,17 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
-from datetime import datetime
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
+import orjson
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from fichas.audit import audit_writer
 from fichas.routes.api import router as api_router
 from fichas.routes.web import router as web_router
 from fichas.settings import settings
@@ -18,27 +22,53 @@ from fichas.services.ocr.provider import validate_ocr_config
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         payload = {
-            "time": datetime.utcnow().isoformat() + "Z",
+            "time": datetime.fromtimestamp(record.created, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
             "level": record.levelname,
             "name": record.name,
             "message": record.getMessage(),
         }
         if record.exc_info:
             payload["exc_info"] = self.formatException(record.exc_info)
-        return json.dumps(payload, ensure_ascii=True)
+        return orjson.dumps(payload).decode("utf-8")
 
 
 def setup_logging():
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    if any(isinstance(handler.formatter, JsonFormatter) for handler in root.handlers):
+        return
     handler = logging.StreamHandler()
     handler.setFormatter(JsonFormatter())
-    root = logging.getLogger()
     root.handlers = [handler]
-    root.setLevel(settings.LOG_LEVEL)
 
 
-setup_logging()
+def startup_init() -> None:
+    if settings.STORAGE_BACKEND.lower() == "local":
+        get_storage_backend()
+    try:
+        validate_ocr_config(require_bucket_for_pdf=False)
+    except ValueError as exc:
+        logging.getLogger(__name__).error("OCR config invalida: %s", exc)
+        raise RuntimeError(str(exc))
+
 
-app = FastAPI(title="Fichas TCM-SP", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    startup_init()
+    yield
+    if not await asyncio.to_thread(audit_writer.drain, settings.AUDIT_DRAIN_TIMEOUT_SECONDS):
+        logging.getLogger(__name__).warning(
+            "Fila de auditoria nao esvaziou em %ss", settings.AUDIT_DRAIN_TIMEOUT_SECONDS
+        )
+
+
+app = FastAPI(
+    title="Fichas TCM-SP",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 base_path = settings.APP_BASE_PATH
 app.include_router(web_router, prefix=base_path)
@@ -49,14 +79,3 @@ static_dir = Path(__file__).resolve().parent / "static"
 if static_dir.exists():
     static_prefix = f"{base_path}/static" if base_path else "/static"
     app.mount(static_prefix, StaticFiles(directory=static_dir), name="static")
-
-
-@app.on_event("startup")
-def startup_init() -> None:
-    if settings.STORAGE_BACKEND.lower() == "local":
-        get_storage_backend()
-    try:
-        validate_ocr_config(require_bucket_for_pdf=False)
-    except ValueError as exc:
-        logging.getLogger(__name__).error("OCR config invalida: %s", exc)
-        raise RuntimeError(str(exc))
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import os
+import threading
+import time
 import uuid
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
+    CheckConstraint,
     Column,
     Date,
     DateTime,
@@ -16,12 +21,65 @@ from sqlalchemy import (
     UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID as PGUUID
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.orm import declarative_base, deferred, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.types import JSON, TypeDecorator
 
 Base = declarative_base()
 
+OCR_ACTIVE_STATUSES = ("queued", "processing")
+OCR_JOB_STATUSES = (*OCR_ACTIVE_STATUSES, "done", "failed")
+
+
+_uuid7_lock = threading.Lock()
+_uuid7_last = 0
+
+
+def uuid7() -> uuid.UUID:
+    global _uuid7_last
+    with _uuid7_lock:
+        millis = time.time_ns() // 1_000_000
+        counter = int.from_bytes(os.urandom(10), "big") >> 6
+        value = (millis << 74) | counter
+        if value <= _uuid7_last:
+            value = _uuid7_last + 1
+        _uuid7_last = value
+    high, low = value >> 62, value & ((1 << 62) - 1)
+    return uuid.UUID(int=((high >> 12) << 80) | (0x7 << 76) | ((high & 0xFFF) << 64) | (0x2 << 62) | low)
+
+
+def _as_uuid(value) -> uuid.UUID:
+    if value.__class__ is uuid.UUID:
+        return value
+    return uuid.UUID(str(value))
+
+
+def coerce_uuid(value) -> uuid.UUID | None:
+    try:
+        return _as_uuid(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _uuid_result(value) -> uuid.UUID | None:
+    if value is None or value.__class__ is uuid.UUID:
+        return value
+    return uuid.UUID(str(value))
+
+
+def _uuid_bind_native(value) -> uuid.UUID | None:
+    return None if value is None else _as_uuid(value)
+
+
+def _uuid_bind_string(value) -> str | None:
+    return None if value is None else str(_as_uuid(value))
+
+
+def _uuid_bind(dialect):
+    if dialect.name == "postgresql":
+        return _uuid_bind_native
+    return _uuid_bind_string
+
 
 class GUID(TypeDecorator):
     impl = String(36)
@@ -33,20 +91,23 @@ class GUID(TypeDecorator):
         return dialect.type_descriptor(String(36))
 
     def process_bind_param(self, value, dialect):
-        if value is None:
-            return None
-        if dialect.name == "postgresql":
-            return value
-        if not isinstance(value, uuid.UUID):
-            value = uuid.UUID(str(value))
-        return str(value)
+        return _uuid_bind(dialect)(value)
 
     def process_result_value(self, value, dialect):
-        if value is None:
-            return None
-        if isinstance(value, uuid.UUID):
-            return value
-        return uuid.UUID(str(value))
+        return _uuid_result(value)
+
+    def bind_processor(self, dialect):
+        impl_processor = self.impl_instance.bind_processor(dialect)
+        process = _uuid_bind(dialect)
+        if impl_processor is None:
+            return process
+        return lambda value: impl_processor(process(value))
+
+    def result_processor(self, dialect, coltype):
+        impl_processor = self.impl_instance.result_processor(dialect, coltype)
+        if impl_processor is None:
+            return _uuid_result
+        return lambda value: _uuid_result(impl_processor(value))
 
 
 JSONType = JSONB().with_variant(JSON(), "sqlite")
@@ -55,11 +116,12 @@ JSONType = JSONB().with_variant(JSON(), "sqlite")
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
-    email = Column(String(320), unique=True, nullable=False, index=True)
+    id = Column(GUID(), primary_key=True, default=uuid7)
+    email = Column(String(320), unique=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
     is_admin = Column(Boolean, nullable=False, default=False)
+    token_version = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     audit_logs = relationship("AuditLog", back_populates="user")
@@ -68,7 +130,7 @@ class User(Base):
 class Process(Base):
     __tablename__ = "processes"
 
-    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid7)
     process_key = Column(String(100), unique=True, nullable=True)
     tc_numero = Column(String(50), nullable=True)
     ano = Column(Integer, nullable=True)
@@ -94,7 +156,7 @@ class FichaTemplate(Base):
     __tablename__ = "ficha_templates"
     __table_args__ = (UniqueConstraint("nome", "versao", name="uq_ficha_templates_nome_versao"),)
 
-    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid7)
     nome = Column(String(150), nullable=False)
     versao = Column(Integer, nullable=False, default=1)
     origem_pdf = Column(String(255), nullable=True)
@@ -115,7 +177,7 @@ class FichaTemplate(Base):
 class Ficha(Base):
     __tablename__ = "fichas"
 
-    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid7)
     process_id = Column(GUID(), ForeignKey("processes.id"), nullable=False)
     template_id = Column(GUID(), ForeignKey("ficha_templates.id"), nullable=False)
     template_version = Column(Integer, nullable=False, default=1)
@@ -144,7 +206,7 @@ class Ficha(Base):
 class Attachment(Base):
     __tablename__ = "attachments"
 
-    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid7)
     ficha_id = Column(GUID(), ForeignKey("fichas.id"), nullable=False)
     filename = Column(String(255), nullable=False)
     content_type = Column(String(100), nullable=False)
@@ -158,11 +220,13 @@ class Attachment(Base):
 class UploadedDocument(Base):
     __tablename__ = "uploaded_documents"
 
-    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid7)
     user_id = Column(GUID(), ForeignKey("users.id"), nullable=False)
     original_filename = Column(String(255), nullable=False)
     content_type = Column(String(100), nullable=False)
     storage_path = Column(String(512), nullable=False)
+    size = Column(BigInteger, nullable=True)
+    sha256 = Column(String(64), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("User")
@@ -171,14 +235,20 @@ class UploadedDocument(Base):
 
 class OcrJob(Base):
     __tablename__ = "ocr_jobs"
+    __table_args__ = (
+        CheckConstraint(
+            "status IN (" + ", ".join(f"'{value}'" for value in OCR_JOB_STATUSES) + ")",
+            name="ck_ocr_jobs_status",
+        ),
+    )
 
-    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid7)
     user_id = Column(GUID(), ForeignKey("users.id"), nullable=False)
     template_id = Column(GUID(), ForeignKey("ficha_templates.id"), nullable=True)
     document_id = Column(GUID(), ForeignKey("uploaded_documents.id"), nullable=False)
     status = Column(String(20), nullable=False, default="queued")
-    extracted_text = Column(Text, nullable=True)
-    ocr_raw_json = Column(JSONType, nullable=True)
+    extracted_text = deferred(Column(Text, nullable=True))
+    ocr_raw_json = deferred(Column(JSONType, nullable=True))
     field_suggestions_json = Column(JSONType, nullable=True)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -187,13 +257,13 @@ class OcrJob(Base):
 
     user = relationship("User")
     template = relationship("FichaTemplate")
-    document = relationship("UploadedDocument", back_populates="ocr_jobs")
+    document = relationship("UploadedDocument", back_populates="ocr_jobs", lazy="raise")
 
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
-    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid7)
     user_id = Column(GUID(), ForeignKey("users.id"), nullable=True)
     action = Column(String(50), nullable=False)
     entity = Column(String(100), nullable=False)
@@ -205,15 +275,63 @@ class AuditLog(Base):
     user = relationship("User", back_populates="audit_logs")
 
 
+Index("ix_users_email_lower", func.lower(User.email), unique=True)
+Index("ix_processes_created_id", Process.created_at.desc(), Process.id.desc())
 Index("ix_processes_tc_numero", Process.tc_numero)
-Index("ix_processes_ano", Process.ano)
-Index("ix_processes_interessado", Process.interessado)
-Index("ix_processes_assunto", Process.assunto)
-Index("ix_fichas_process_id", Ficha.process_id)
-Index("ix_fichas_template_id", Ficha.template_id)
+Index("ix_processes_ano_created", Process.ano, Process.created_at.desc(), Process.id.desc())
+Index(
+    "ix_processes_interessado_trgm",
+    Process.interessado,
+    postgresql_using="gin",
+    postgresql_ops={"interessado": "gin_trgm_ops"},
+)
+Index(
+    "ix_processes_assunto_trgm",
+    Process.assunto,
+    postgresql_using="gin",
+    postgresql_ops={"assunto": "gin_trgm_ops"},
+)
+Index(
+    "ix_fichas_process_covering",
+    Ficha.process_id,
+    Ficha.status,
+    postgresql_include=["template_id", "indexador", "updated_at"],
+)
+Index("ix_fichas_created_id", Ficha.created_at.desc(), Ficha.id.desc())
+Index(
+    "ix_fichas_template_status_created",
+    Ficha.template_id,
+    Ficha.status,
+    Ficha.created_at.desc(),
+    Ficha.id.desc(),
+    postgresql_include=["indexador", "process_id"],
+)
 Index("ix_fichas_indexador", Ficha.indexador)
 Index("ix_fichas_status", Ficha.status)
+Index(
+    "ix_fichas_campos_base_gin",
+    Ficha.campos_base_json,
+    postgresql_using="gin",
+    postgresql_ops={"campos_base_json": "jsonb_path_ops"},
+)
+Index(
+    "ix_fichas_extras_gin",
+    Ficha.extras_json,
+    postgresql_using="gin",
+    postgresql_ops={"extras_json": "jsonb_path_ops"},
+)
 Index("ix_uploaded_documents_user_id", UploadedDocument.user_id)
 Index("ix_ocr_jobs_user_id", OcrJob.user_id)
-Index("ix_ocr_jobs_status", OcrJob.status)
+Index(
+    "ix_ocr_jobs_queue",
+    OcrJob.status,
+    OcrJob.created_at,
+    postgresql_where=OcrJob.status.in_(OCR_ACTIVE_STATUSES),
+)
 Index("ix_ocr_jobs_created_at", OcrJob.created_at)
+Index(
+    "ix_ocr_jobs_field_suggestions_gin",
+    OcrJob.field_suggestions_json,
+    postgresql_using="gin",
+    postgresql_ops={"field_suggestions_json": "jsonb_path_ops"},
+)
@@ -1,43 +1,92 @@
 from __future__ import annotations
 
-from datetime import date
-from typing import Any, Annotated
-
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+import base64
+from datetime import datetime
+from typing import Annotated
+import uuid
+
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from fichas.audit import model_to_dict
 from fichas.auth import get_current_user
-from fichas.db import get_db
-from fichas.schemas import FichaOut, ProcessForm, ProcessOut
-from fichas.services.fichas_service import list_fichas
-from fichas.services.processos_service import create_process, get_process, list_processes, update_process
-from fichas.services.templates_service import list_templates
+from fichas.db import get_async_read_db, get_db
+from fichas.schemas import FichaListQuery, FichaOut, ProcessForm, ProcessListQuery, ProcessOut
+from fichas.services.fichas_service import list_ficha_rows
+from fichas.services.processos_service import (
+    create_process,
+    get_process,
+    get_process_async,
+    list_process_rows,
+    update_process,
+)
+from fichas.services.templates_service import list_templates, template_list_etag
+from fichas.settings import settings
 
 router = APIRouter()
 
+_PROCESS_LIST_ADAPTER = TypeAdapter(list[ProcessOut])
+_FICHA_LIST_ADAPTER = TypeAdapter(list[FichaOut])
+_PROCESS_LIST_COLUMNS = list(ProcessOut.model_fields)
+_FICHA_LIST_COLUMNS = list(FichaOut.model_fields)
+_template_list_cache: TTLCache[str, bytes] = TTLCache(maxsize=4, ttl=settings.TEMPLATE_LIST_CACHE_SECONDS)
 
-@router.get("/processos", response_model=dict[str, Any])
-def api_list_processes(
-    request: Request,
-    db: Annotated[Session, Depends(get_db)],
+
+def clear_template_list_cache() -> None:
+    _template_list_cache.clear()
+
+
+def _encode_cursor(row) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str | None) -> tuple[datetime, uuid.UUID] | None:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor invalido")
+
+
+def _page_response(adapter: TypeAdapter, items, total: int | None, page: int, page_size: int) -> ORJSONResponse:
+    rows = adapter.validate_python(items)
+    return ORJSONResponse(
+        {
+            "items": adapter.dump_python(rows, mode="json"),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "next_cursor": _encode_cursor(rows[-1]) if len(rows) == page_size else None,
+        }
+    )
+
+
+@router.get("/processos", response_class=ORJSONResponse)
+async def api_list_processes(
+    query: Annotated[ProcessListQuery, Depends()],
+    db: Annotated[AsyncSession, Depends(get_async_read_db)],
     user: Annotated[object, Depends(get_current_user)],
 ):
-    page = int(request.query_params.get("page", "1"))
-    page_size = int(request.query_params.get("page_size", "20"))
-    filters = {
-        "numero": request.query_params.get("numero"),
-        "ano": request.query_params.get("ano"),
-        "interessado": request.query_params.get("interessado"),
-        "assunto": request.query_params.get("assunto"),
-    }
-    items, total = list_processes(db, filters, page, page_size)
-    return {
-        "items": [ProcessOut.model_validate(item).model_dump() for item in items],
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-    }
+    after = _decode_cursor(query.cursor)
+    items, total = await list_process_rows(
+        db,
+        query.filters(),
+        query.page,
+        query.page_size,
+        _PROCESS_LIST_COLUMNS,
+        after,
+        count=after is None,
+    )
+    return _page_response(_PROCESS_LIST_ADAPTER, items, total, query.page, query.page_size)
 
 
 @router.post("/processos", response_model=ProcessOut)
@@ -47,19 +96,19 @@ def api_create_process(
     user: Annotated[object, Depends(get_current_user)],
 ):
     process = create_process(db, payload.model_dump(), user)
-    return ProcessOut.model_validate(process)
+    return process
 
 
 @router.get("/processos/{process_id}", response_model=ProcessOut)
-def api_get_process(
+async def api_get_process(
     process_id: str,
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_async_read_db)],
     user: Annotated[object, Depends(get_current_user)],
 ):
-    process = get_process(db, process_id)
+    process = await get_process_async(db, process_id)
     if not process:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Processo nao encontrado")
-    return ProcessOut.model_validate(process)
+    return process
 
 
 @router.patch("/processos/{process_id}", response_model=ProcessOut)
@@ -73,53 +122,40 @@ def api_update_process(
     if not process:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Processo nao encontrado")
     process = update_process(db, process, payload.model_dump(), user)
-    return ProcessOut.model_validate(process)
+    return process
 
 
-@router.get("/fichas", response_model=dict[str, Any])
-def api_list_fichas(
-    request: Request,
-    db: Annotated[Session, Depends(get_db)],
+@router.get("/fichas", response_class=ORJSONResponse)
+async def api_list_fichas(
+    query: Annotated[FichaListQuery, Depends()],
+    db: Annotated[AsyncSession, Depends(get_async_read_db)],
     user: Annotated[object, Depends(get_current_user)],
 ):
-    page = int(request.query_params.get("page", "1"))
-    page_size = int(request.query_params.get("page_size", "20"))
-    data_inicio = request.query_params.get("data_inicio")
-    data_fim = request.query_params.get("data_fim")
-    filters = {
-        "q": request.query_params.get("q"),
-        "numero": request.query_params.get("numero"),
-        "ano": request.query_params.get("ano"),
-        "interessado": request.query_params.get("interessado"),
-        "assunto": request.query_params.get("assunto"),
-        "template_id": request.query_params.get("template_id"),
-        "status": request.query_params.get("status"),
-        "data_inicio": None,
-        "data_fim": None,
-    }
-    if data_inicio:
-        try:
-            filters["data_inicio"] = date.fromisoformat(data_inicio)
-        except ValueError:
-            pass
-    if data_fim:
-        try:
-            filters["data_fim"] = date.fromisoformat(data_fim)
-        except ValueError:
-            pass
-    items, total = list_fichas(db, filters, page, page_size)
-    return {
-        "items": [FichaOut.model_validate(item).model_dump() for item in items],
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-    }
-
-
-@router.get("/templates", response_model=list[dict[str, Any]])
+    after = _decode_cursor(query.cursor)
+    items, total = await list_ficha_rows(
+        db,
+        query.filters(),
+        query.page,
+        query.page_size,
+        _FICHA_LIST_COLUMNS,
+        after,
+        count=after is None,
+    )
+    return _page_response(_FICHA_LIST_ADAPTER, items, total, query.page, query.page_size)
+
+
+@router.get("/templates", response_class=Response)
 def api_list_templates(
+    request: Request,
     db: Annotated[Session, Depends(get_db)],
     user: Annotated[object, Depends(get_current_user)],
 ):
-    templates = list_templates(db)
-    return [model_to_dict(template) for template in templates]
+    etag = template_list_etag(db)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.TEMPLATE_LIST_CACHE_SECONDS}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body = _template_list_cache.get(etag)
+    if body is None:
+        body = orjson.dumps([model_to_dict(template) for template in list_templates(db)])
+        _template_list_cache[etag] = body
+    return Response(content=body, media_type="application/json", headers=headers)
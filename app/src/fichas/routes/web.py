@@ -1,39 +1,47 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import logging
+import re
 from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 from urllib.parse import urlencode
 
-from fastapi import APIRouter, Depends, File, Request, Response, UploadFile
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Request, Response, UploadFile
 from starlette.datastructures import UploadFile as StarletteUploadFile
 from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from pydantic import ValidationError
-from sqlalchemy import func, select
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only
 
 from fichas import __version__
 from fichas.auth import (
     SESSION_COOKIE_NAME,
+    UserClaims,
     authenticate_user,
     create_session_token,
-    get_current_user_optional,
+    forget_session_token,
+    get_current_user_optional_async,
 )
-from fichas.db import get_db
-from fichas.models import Attachment, Ficha, FichaTemplate, OcrJob, Process, UploadedDocument
+from fichas.db import SessionLocal, get_async_db
+from fichas.models import Attachment, Ficha, FichaTemplate, OcrJob, Process, UploadedDocument, coerce_uuid
 from fichas.schemas import (
+    MAX_PAGE_SIZE,
     FichaBaseForm,
     LoginForm,
     ProcessForm,
     TemplateForm,
     TemplateSchema,
-    build_template_field_map,
-    normalize_template_schema,
     validation_errors_to_dict,
 )
+from fichas.services.dashboard_service import get_dashboard_summary
 from fichas.services.fichas_service import (
     create_ficha,
     delete_ficha,
@@ -47,18 +55,43 @@ from fichas.services.templates_service import (
     create_template,
     create_template_version,
     get_template,
+    get_template_field_map,
+    get_template_schema,
+    get_template_schema_text,
     import_template_payload,
-    list_templates,
+    list_cached_templates,
     set_template_active,
 )
 from fichas.services.queue import enqueue_process_ocr
-from fichas.services.storage import resolve_upload_path, save_upload
+from fichas.services.storage import GENERIC_CONTENT_TYPES, resolve_upload_path, save_upload
 from fichas.settings import settings
 from fichas.storage import get_storage_backend
+from fichas.storage.base import iter_chunks
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory=str(Path(__file__).resolve().parents[1] / "templates"))
+FICHA_STATUSES = frozenset({"ativo", "rascunho", "arquivado"})
+TRUTHY_FORM_VALUES = frozenset({"1", "true", "on", "yes"})
+
+
+def _template_environment() -> Environment:
+    bytecode_cache = None
+    if settings.JINJA_BYTECODE_CACHE_DIR:
+        cache_dir = Path(settings.JINJA_BYTECODE_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+    return Environment(
+        loader=FileSystemLoader(str(Path(__file__).resolve().parents[1] / "templates")),
+        autoescape=True,
+        auto_reload=settings.TEMPLATES_AUTO_RELOAD,
+        cache_size=400,
+        bytecode_cache=bytecode_cache,
+    )
+
+
+templates = Jinja2Templates(env=_template_environment())
 
 
 def _select_upload(form: Any) -> StarletteUploadFile | None:
@@ -68,8 +101,10 @@ def _select_upload(form: Any) -> StarletteUploadFile | None:
         if (upload.filename or "").strip():
             return True
         content_type = (upload.content_type or "").lower()
-        if content_type and content_type not in {"application/octet-stream", "binary/octet-stream"}:
+        if content_type and content_type not in GENERIC_CONTENT_TYPES:
             return True
+        if upload.size is not None:
+            return upload.size > 0
         try:
             header = upload.file.read(1)
             upload.file.seek(0)
@@ -102,11 +137,29 @@ def format_datetime(value):
     return value.strftime("%Y-%m-%d %H:%M")
 
 
+def _query_items(params, overrides: dict[str, Any]):
+    for key, value in params.items():
+        override = overrides.get(key)
+        yield key, value if override is None else override
+    for key, value in overrides.items():
+        if key not in params:
+            yield key, value
+
+
 def build_query(params, **overrides):
-    data = dict(params)
-    data.update({k: v for k, v in overrides.items() if v is not None})
-    clean = {k: v for k, v in data.items() if v not in ("", None)}
-    return urlencode(clean, doseq=True)
+    return urlencode([(k, v) for k, v in _query_items(params, overrides) if v not in ("", None)], doseq=True)
+
+
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def parse_date_filter(value: str | None) -> date | None:
+    if not value or not _ISO_DATE.fullmatch(value):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
 
 
 def process_label(process: Process | None):
@@ -127,12 +180,18 @@ templates.env.globals["app_version"] = __version__
 templates.env.globals["app_prefix"] = settings.APP_BASE_PATH
 
 
+_PREFIX = settings.APP_BASE_PATH or ""
+
+
 def with_prefix(path: str) -> str:
-    if not path.startswith("/"):
-        path = f"/{path}"
-    if not settings.APP_BASE_PATH:
-        return path
-    return f"{settings.APP_BASE_PATH}{path}"
+    return _PREFIX + path if path[:1] == "/" else f"{_PREFIX}/{path}"
+
+
+_HOME_URL = with_prefix("/")
+_LOGIN_URL = with_prefix("/login")
+_FICHAS_URL = with_prefix("/fichas")
+_PROCESSOS_URL = with_prefix("/processos")
+_ADMIN_TEMPLATES_URL = with_prefix("/admin/templates")
 
 
 templates.env.globals["url_path"] = with_prefix
@@ -142,59 +201,123 @@ def is_htmx(request: Request) -> bool:
     return request.headers.get("HX-Request") == "true"
 
 
-def ensure_user(request: Request, db: Session, admin: bool = False):
-    user = get_current_user_optional(request, db)
+async def require_user(request: Request, db: AsyncSession = Depends(get_async_db)) -> UserClaims:
+    user = await get_current_user_optional_async(request, db)
     if not user:
-        return RedirectResponse(with_prefix("/login"), status_code=303)
-    if admin and not user.is_admin:
-        return RedirectResponse(with_prefix("/"), status_code=303)
+        raise HTTPException(status_code=303, headers={"Location": _LOGIN_URL})
+    return user
+
+
+async def require_admin(user: UserClaims = Depends(require_user)) -> UserClaims:
+    if not user.is_admin:
+        raise HTTPException(status_code=303, headers={"Location": _HOME_URL})
     return user
 
 
-def build_pagination(page: int, page_size: int, total: int) -> dict[str, int | bool]:
+class Pagination(NamedTuple):
+    page: int
+    page_size: int
+    total: int
+    pages: int
+    has_prev: bool
+    has_next: bool
+    start: int
+    end: int
+
+
+def build_pagination(page: int, page_size: int, total: int) -> Pagination:
     pages = max(1, (total + page_size - 1) // page_size)
     start = (page - 1) * page_size + 1 if total else 0
     end = min(page * page_size, total) if total else 0
-    return {
-        "page": page,
-        "page_size": page_size,
-        "total": total,
-        "pages": pages,
-        "has_prev": page > 1,
-        "has_next": page < pages,
-        "start": start,
-        "end": end,
-    }
+    return Pagination(page, page_size, total, pages, page > 1, page < pages, start, end)
+
+
+async def get_ocr_job(
+    db: AsyncSession,
+    job_id: str,
+    user,
+    with_document: bool = False,
+    status_only: bool = False,
+) -> OcrJob | None:
+    query = select(OcrJob).where(OcrJob.id == job_id, OcrJob.user_id == user.id)
+    if with_document:
+        query = query.options(joinedload(OcrJob.document))
+    if status_only:
+        query = query.options(load_only(OcrJob.status, OcrJob.started_at, OcrJob.finished_at, OcrJob.error_message))
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+
+_manual_template_id = None
+
+
+async def get_or_create_manual_template(db: AsyncSession, user) -> FichaTemplate:
+    global _manual_template_id
+    if _manual_template_id is not None:
+        template = await db.get(FichaTemplate, _manual_template_id)
+        if template:
+            return template
+    result = await db.execute(select(FichaTemplate).where(FichaTemplate.nome == "Cadastro manual"))
+    template = result.scalar_one_or_none()
+    if not template:
+        schema = {"sections": [{"id": "geral", "label": "Geral", "order": 1, "fields": []}]}
+        template = await db.run_sync(create_template, "Cadastro manual", "Ficha sem campos extras", schema, user)
+    _manual_template_id = template.id
+    return template
+
+
+async def find_existing_process(db: AsyncSession, base_fields: FichaBaseForm) -> Process | None:
+    processo = None
+    if base_fields.process_key:
+        result = await db.execute(select(Process).where(Process.process_key == base_fields.process_key))
+        processo = result.scalar_one_or_none()
+    if not processo and base_fields.tc_numero and base_fields.ano:
+        result = await db.execute(
+            select(Process).where(
+                Process.tc_numero == base_fields.tc_numero,
+                Process.ano == base_fields.ano,
+            )
+        )
+        processo = result.scalar_one_or_none()
+    return processo
 
 
-def get_ocr_job(db: Session, job_id: str, user) -> OcrJob | None:
-    return (
-        db.execute(select(OcrJob).where(OcrJob.id == job_id, OcrJob.user_id == user.id))
-        .scalar_one_or_none()
-    )
+def _save_upload_document(upload: StarletteUploadFile, user_id) -> UploadedDocument:
+    with SessionLocal() as session:
+        return save_upload(upload, user_id, session)
 
 
-def get_or_create_manual_template(db: Session, user) -> FichaTemplate:
-    template = db.execute(select(FichaTemplate).where(FichaTemplate.nome == "Cadastro manual")).scalar_one_or_none()
-    if template:
-        return template
-    schema = {"sections": [{"id": "geral", "label": "Geral", "order": 1, "fields": []}]}
-    return create_template(db, "Cadastro manual", "Ficha sem campos extras", schema, user)
+def _enqueue_ocr_job(job_id: str) -> None:
+    try:
+        enqueue_process_ocr(job_id)
+    except Exception:
+        logger.exception("Falha ao enfileirar OCR do job %s", job_id)
+        with SessionLocal() as session:
+            session.execute(
+                update(OcrJob)
+                .where(OcrJob.id == job_id, OcrJob.status == "queued")
+                .values(
+                    status="failed",
+                    error_message="Nao foi possivel enfileirar o OCR. Reenvie o arquivo.",
+                    finished_at=datetime.now(timezone.utc),
+                )
+            )
+            session.commit()
 
 
 @router.get("/login")
-def login_page(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user_optional(request, db)
+async def login_page(request: Request, db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user_optional_async(request, db)
     if user:
-        return RedirectResponse(with_prefix("/"), status_code=303)
+        return RedirectResponse(_HOME_URL, status_code=303)
     return templates.TemplateResponse("login.html", {"request": request, "show_nav": False})
 
 
 @router.post("/login")
-async def login_action(request: Request, db: Session = Depends(get_db)):
+async def login_action(request: Request, db: AsyncSession = Depends(get_async_db)):
     form = await request.form()
     data = LoginForm.model_validate(form)
-    user = authenticate_user(db, data.email, data.password)
+    user = await db.run_sync(authenticate_user, data.email, data.password)
     if not user:
         return templates.TemplateResponse(
             "login.html",
@@ -202,8 +325,8 @@ async def login_action(request: Request, db: Session = Depends(get_db)):
             status_code=401,
         )
 
-    token = create_session_token(user.id)
-    response = RedirectResponse(with_prefix("/"), status_code=303)
+    token = create_session_token(user)
+    response = RedirectResponse(_HOME_URL, status_code=303)
     response.set_cookie(
         SESSION_COOKIE_NAME,
         token,
@@ -216,59 +339,25 @@ async def login_action(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/logout")
-def logout_action():
-    response = RedirectResponse(with_prefix("/login"), status_code=303)
+def logout_action(request: Request):
+    forget_session_token(request.cookies.get(SESSION_COOKIE_NAME))
+    response = RedirectResponse(_LOGIN_URL, status_code=303)
     response.delete_cookie(SESSION_COOKIE_NAME)
     return response
 
 
 @router.get("/")
-def dashboard(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    processos_total = db.execute(select(func.count()).select_from(Process)).scalar_one()
-    fichas_total = db.execute(select(func.count()).select_from(Ficha)).scalar_one()
-    templates_total = db.execute(select(func.count()).select_from(FichaTemplate)).scalar_one()
-    active_templates = (
-        db.execute(
-            select(FichaTemplate)
-            .where(FichaTemplate.is_active.is_(True))
-            .order_by(FichaTemplate.nome.asc(), FichaTemplate.versao.desc())
-            .limit(6)
-        )
-        .scalars()
-        .all()
-    )
-    recent_fichas = (
-        db.execute(
-            select(Ficha)
-            .options(selectinload(Ficha.process), selectinload(Ficha.template))
-            .order_by(Ficha.created_at.desc())
-            .limit(5)
-        )
-        .scalars()
-        .all()
-    )
-    return templates.TemplateResponse(
-        "dashboard.html",
-        {
-            "request": request,
-            "user": user,
-            "processos_total": processos_total,
-            "fichas_total": fichas_total,
-            "templates_total": templates_total,
-            "active_templates": active_templates,
-            "recent_fichas": recent_fichas,
-        },
-    )
+async def dashboard(
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    summary = await get_dashboard_summary(db)
+    return templates.TemplateResponse("dashboard.html", {"request": request, "user": user, **summary})
 
 
 @router.get("/saiba-mais")
-def saiba_mais(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
+async def saiba_mais(request: Request, user: UserClaims = Depends(require_user)):
     return templates.TemplateResponse(
         "saiba_mais.html",
         {"request": request, "user": user},
@@ -276,20 +365,19 @@ def saiba_mais(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/processos")
-def processos_list(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-
-    page = int(request.query_params.get("page", "1"))
-    page_size = int(request.query_params.get("page_size", settings.PAGINATION_PAGE_SIZE))
-    filters = {
-        "numero": request.query_params.get("numero"),
-        "ano": request.query_params.get("ano"),
-        "interessado": request.query_params.get("interessado"),
-        "assunto": request.query_params.get("assunto"),
-    }
-    processos, total = list_processes(db, filters, page, page_size)
+async def processos_list(
+    request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(settings.PAGINATION_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    numero: str | None = None,
+    ano: str | None = None,
+    interessado: str | None = None,
+    assunto: str | None = None,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    filters = {"numero": numero, "ano": ano, "interessado": interessado, "assunto": assunto}
+    processos, total = await db.run_sync(list_processes, filters, page, page_size)
     pagination = build_pagination(page, page_size, total)
     template_name = "partials/processos_table.html" if is_htmx(request) else "processos_list.html"
     return templates.TemplateResponse(
@@ -305,10 +393,7 @@ def processos_list(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/processos/novo")
-def processo_novo(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
+async def processo_novo(request: Request, user: UserClaims = Depends(require_user)):
     return templates.TemplateResponse(
         "processo_form.html",
         {"request": request, "user": user, "processo": None, "form": {}},
@@ -316,12 +401,12 @@ def processo_novo(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/processos/novo")
-async def processo_criar(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    form = await request.form()
-    form_data = dict(form)
+async def processo_criar(
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    form_data = await request.form()
     try:
         data = ProcessForm.model_validate(form_data)
     except ValidationError as exc:
@@ -332,18 +417,20 @@ async def processo_criar(request: Request, db: Session = Depends(get_db)):
             status_code=400,
         )
 
-    processo = create_process(db, data.model_dump(), user)
+    processo = await db.run_sync(create_process, data.model_dump(), user)
     return RedirectResponse(with_prefix(f"/processos/{processo.id}"), status_code=303)
 
 
 @router.get("/processos/{process_id}")
-def processo_detail(process_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    processo = get_process(db, process_id)
+async def processo_detail(
+    process_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    processo = await db.run_sync(get_process, process_id)
     if not processo:
-        return RedirectResponse(with_prefix("/processos"), status_code=303)
+        return RedirectResponse(_PROCESSOS_URL, status_code=303)
     return templates.TemplateResponse(
         "processo_detail.html",
         {"request": request, "user": user, "processo": processo},
@@ -351,13 +438,15 @@ def processo_detail(process_id: str, request: Request, db: Session = Depends(get
 
 
 @router.get("/processos/{process_id}/editar")
-def processo_editar(process_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    processo = get_process(db, process_id)
+async def processo_editar(
+    process_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    processo = await db.run_sync(get_process, process_id)
     if not processo:
-        return RedirectResponse(with_prefix("/processos"), status_code=303)
+        return RedirectResponse(_PROCESSOS_URL, status_code=303)
     return templates.TemplateResponse(
         "processo_form.html",
         {"request": request, "user": user, "processo": processo, "form": {}},
@@ -365,16 +454,17 @@ def processo_editar(process_id: str, request: Request, db: Session = Depends(get
 
 
 @router.post("/processos/{process_id}/editar")
-async def processo_atualizar(process_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    processo = get_process(db, process_id)
+async def processo_atualizar(
+    process_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    processo = await db.run_sync(get_process, process_id)
     if not processo:
-        return RedirectResponse(with_prefix("/processos"), status_code=303)
+        return RedirectResponse(_PROCESSOS_URL, status_code=303)
 
-    form = await request.form()
-    form_data = dict(form)
+    form_data = await request.form()
     try:
         data = ProcessForm.model_validate(form_data)
     except ValidationError as exc:
@@ -385,45 +475,43 @@ async def processo_atualizar(process_id: str, request: Request, db: Session = De
             status_code=400,
         )
 
-    processo = update_process(db, processo, data.model_dump(), user)
+    processo = await db.run_sync(update_process, processo, data.model_dump(), user)
     return RedirectResponse(with_prefix(f"/processos/{processo.id}"), status_code=303)
 
 
 @router.get("/fichas")
-def fichas_list(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-
-    page = int(request.query_params.get("page", "1"))
-    page_size = int(request.query_params.get("page_size", settings.PAGINATION_PAGE_SIZE))
-    data_inicio_raw = request.query_params.get("data_inicio")
-    data_fim_raw = request.query_params.get("data_fim")
+async def fichas_list(
+    request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(settings.PAGINATION_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    q: str | None = None,
+    numero: str | None = None,
+    ano: str | None = None,
+    interessado: str | None = None,
+    assunto: str | None = None,
+    indexador: str | None = None,
+    template_id: str | None = None,
+    status: str | None = None,
+    data_inicio: str | None = None,
+    data_fim: str | None = None,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
     filters = {
-        "q": request.query_params.get("q"),
-        "numero": request.query_params.get("numero"),
-        "ano": request.query_params.get("ano"),
-        "interessado": request.query_params.get("interessado"),
-        "assunto": request.query_params.get("assunto"),
-        "indexador": request.query_params.get("indexador"),
-        "template_id": request.query_params.get("template_id"),
-        "status": request.query_params.get("status"),
-        "data_inicio": None,
-        "data_fim": None,
+        "q": q,
+        "numero": numero,
+        "ano": ano,
+        "interessado": interessado,
+        "assunto": assunto,
+        "indexador": indexador,
+        "template_id": template_id,
+        "status": status,
+        "data_inicio": parse_date_filter(data_inicio),
+        "data_fim": parse_date_filter(data_fim),
     }
-    if data_inicio_raw:
-        try:
-            filters["data_inicio"] = date.fromisoformat(data_inicio_raw)
-        except ValueError:
-            pass
-    if data_fim_raw:
-        try:
-            filters["data_fim"] = date.fromisoformat(data_fim_raw)
-        except ValueError:
-            pass
-    fichas, total = list_fichas(db, filters, page, page_size)
+    fichas, total = await db.run_sync(list_fichas, filters, page, page_size)
     pagination = build_pagination(page, page_size, total)
-    templates_list = list_templates(db)
+    templates_list = await db.run_sync(list_cached_templates)
     template_name = "partials/fichas_table.html" if is_htmx(request) else "fichas_list.html"
     return templates.TemplateResponse(
         template_name,
@@ -439,11 +527,12 @@ def fichas_list(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/fichas/importar")
-def fichas_importar(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    templates_list = list_templates(db, active_only=True)
+async def fichas_importar(
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    templates_list = await db.run_sync(list_cached_templates, active_only=True)
     return templates.TemplateResponse(
         "fichas_importar.html",
         {
@@ -456,16 +545,18 @@ def fichas_importar(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/fichas/importar")
-async def fichas_importar_submit(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
+async def fichas_importar_submit(
+    request: Request,
+    background: BackgroundTasks,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
     form = await request.form()
     template_id = str(form.get("template_id") or "").strip() or None
     upload = _select_upload(form)
-    templates_list = list_templates(db, active_only=True)
+    templates_list = await db.run_sync(list_cached_templates, active_only=True)
 
-    template = get_template(db, template_id) if template_id else None
+    template = await db.run_sync(get_template, template_id) if template_id else None
     if template_id and not template:
         return templates.TemplateResponse(
             "fichas_importar.html",
@@ -491,7 +582,7 @@ async def fichas_importar_submit(request: Request, db: Session = Depends(get_db)
         )
 
     try:
-        document = save_upload(upload, user.id, db)
+        document = await asyncio.to_thread(_save_upload_document, upload, user.id)
     except ValueError as exc:
         return templates.TemplateResponse(
             "fichas_importar.html",
@@ -511,21 +602,23 @@ async def fichas_importar_submit(request: Request, db: Session = Depends(get_db)
         status="queued",
     )
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
 
-    enqueue_process_ocr(str(job.id))
+    background.add_task(_enqueue_ocr_job, str(job.id))
     return RedirectResponse(with_prefix(f"/fichas/importar/{job.id}"), status_code=303)
 
 
 @router.get("/fichas/importar/{job_id}")
-def fichas_importar_status(job_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    job = get_ocr_job(db, job_id, user)
+async def fichas_importar_status(
+    job_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await get_ocr_job(db, job_id, user)
     if not job:
-        return RedirectResponse(with_prefix("/"), status_code=303)
+        return RedirectResponse(_HOME_URL, status_code=303)
     return templates.TemplateResponse(
         "fichas_importar_status.html",
         {"request": request, "user": user, "job": job},
@@ -533,11 +626,13 @@ def fichas_importar_status(job_id: str, request: Request, db: Session = Depends(
 
 
 @router.get("/fichas/importar/{job_id}/status")
-def fichas_importar_status_poll(job_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    job = get_ocr_job(db, job_id, user)
+async def fichas_importar_status_poll(
+    job_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await get_ocr_job(db, job_id, user, status_only=True)
     if not job:
         return Response(status_code=404)
     if job.status == "processing" and job.started_at:
@@ -547,38 +642,41 @@ def fichas_importar_status_poll(job_id: str, request: Request, db: Session = Dep
             job.error_message = "OCR expirou ou foi interrompido. Reenvie o arquivo."
             job.finished_at = datetime.now(timezone.utc)
             db.add(job)
-            db.commit()
+            await db.commit()
     if job.status == "done":
         return Response(status_code=200, headers={"HX-Redirect": with_prefix(f"/fichas/importar/{job.id}/revisar")})
-    if job.status == "failed":
-        return templates.TemplateResponse(
-            "partials/ocr_status.html",
-            {"request": request, "job": job, "state": "failed"},
-        )
+    state = "failed" if job.status == "failed" else "processing"
+    finished = job.finished_at.timestamp() if job.finished_at else 0
+    headers = {"ETag": f'"{job.status}-{finished}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
     return templates.TemplateResponse(
         "partials/ocr_status.html",
-        {"request": request, "job": job, "state": "processing"},
+        {"request": request, "job": job, "state": state},
+        headers=headers,
     )
 
 
 @router.get("/fichas/importar/{job_id}/revisar")
-def fichas_importar_revisar(job_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    job = get_ocr_job(db, job_id, user)
+async def fichas_importar_revisar(
+    job_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await get_ocr_job(db, job_id, user, with_document=True)
     if not job:
-        return RedirectResponse(with_prefix("/"), status_code=303)
+        return RedirectResponse(_HOME_URL, status_code=303)
     if job.status != "done":
         return RedirectResponse(with_prefix(f"/fichas/importar/{job.id}"), status_code=303)
 
     template_id = request.query_params.get("template_id") or (str(job.template_id) if job.template_id else None)
-    template = get_template(db, template_id) if template_id else None
-    templates_list = list_templates(db, active_only=True)
-    template_schema = normalize_template_schema(template.schema_json) if template else None
+    template = await db.run_sync(get_template, template_id) if template_id else None
+    templates_list = await db.run_sync(list_cached_templates, active_only=True)
+    template_schema = get_template_schema(template) if template else None
 
     process_id = request.query_params.get("process_id")
-    processo = get_process(db, process_id) if process_id else None
+    processo = await db.run_sync(get_process, process_id) if process_id else None
 
     suggestions = job.field_suggestions_json or {"base": {}, "extras": {}}
     return templates.TemplateResponse(
@@ -587,7 +685,7 @@ def fichas_importar_revisar(job_id: str, request: Request, db: Session = Depends
             "request": request,
             "user": user,
             "job": job,
-            "document": db.execute(select(UploadedDocument).where(UploadedDocument.id == job.document_id)).scalar_one(),
+            "document": job.document,
             "template": template,
             "templates_list": templates_list,
             "template_schema": template_schema,
@@ -601,23 +699,25 @@ def fichas_importar_revisar(job_id: str, request: Request, db: Session = Depends
 
 
 @router.get("/fichas/importar/{job_id}/processos")
-def fichas_importar_processos(job_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    job = get_ocr_job(db, job_id, user)
+async def fichas_importar_processos(
+    job_id: str,
+    request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(6, ge=1, le=MAX_PAGE_SIZE),
+    numero: str | None = None,
+    ano: str | None = None,
+    interessado: str | None = None,
+    assunto: str | None = None,
+    template_id: str | None = None,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await get_ocr_job(db, job_id, user)
     if not job:
         return Response(status_code=404)
 
-    page = int(request.query_params.get("page", "1"))
-    page_size = int(request.query_params.get("page_size", 6))
-    filters = {
-        "numero": request.query_params.get("numero"),
-        "ano": request.query_params.get("ano"),
-        "interessado": request.query_params.get("interessado"),
-        "assunto": request.query_params.get("assunto"),
-    }
-    processos, total = list_processes(db, filters, page, page_size)
+    filters = {"numero": numero, "ano": ano, "interessado": interessado, "assunto": assunto}
+    processos, total = await db.run_sync(list_processes, filters, page, page_size)
     pagination = build_pagination(page, page_size, total)
     return templates.TemplateResponse(
         "partials/import_processos_table.html",
@@ -626,52 +726,64 @@ def fichas_importar_processos(job_id: str, request: Request, db: Session = Depen
             "job": job,
             "processos": processos,
             "pagination": pagination,
-            "template_id": request.query_params.get("template_id"),
+            "template_id": template_id,
         },
     )
 
 
 @router.get("/fichas/importar/{job_id}/arquivo")
-def fichas_importar_arquivo(job_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    job = get_ocr_job(db, job_id, user)
+async def fichas_importar_arquivo(
+    job_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await get_ocr_job(db, job_id, user, with_document=True)
     if not job:
-        return RedirectResponse(with_prefix("/"), status_code=303)
-    document = db.execute(select(UploadedDocument).where(UploadedDocument.id == job.document_id)).scalar_one()
+        return RedirectResponse(_HOME_URL, status_code=303)
+    document = job.document
+    headers = {"Cache-Control": "private, max-age=3600"}
+    if document.sha256:
+        headers["ETag"] = f'"{document.sha256}"'
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
     file_path = resolve_upload_path(document.storage_path)
-    return FileResponse(file_path, media_type=document.content_type, filename=document.original_filename)
+    return FileResponse(
+        file_path,
+        media_type=document.content_type,
+        filename=document.original_filename,
+        headers=headers,
+    )
 
 
 @router.post("/fichas/importar/{job_id}/confirmar")
-async def fichas_importar_confirmar(job_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    job = get_ocr_job(db, job_id, user)
+async def fichas_importar_confirmar(
+    job_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await get_ocr_job(db, job_id, user, with_document=True)
     if not job:
-        return RedirectResponse(with_prefix("/"), status_code=303)
+        return RedirectResponse(_HOME_URL, status_code=303)
     if job.status != "done":
         return RedirectResponse(with_prefix(f"/fichas/importar/{job.id}"), status_code=303)
 
-    form = await request.form()
-    form_data = dict(form)
+    form_data = await request.form()
     template_id = form_data.get("template_id") or (str(job.template_id) if job.template_id else None)
-    template = get_template(db, template_id) if template_id else None
-    templates_list = list_templates(db, active_only=True)
-    template_schema = normalize_template_schema(template.schema_json) if template else None
+    template = await db.run_sync(get_template, template_id) if template_id else None
+    template_schema = get_template_schema(template) if template else None
+    errors: dict[str, str] = {}
 
     process_id = form_data.get("process_id")
-    processo = get_process(db, process_id) if process_id else None
+    processo = await db.run_sync(get_process, process_id) if process_id else None
     if process_id and not processo:
         errors["process_id"] = "Processo invalido"
 
     suggestions = job.field_suggestions_json or {"base": {}, "extras": {}}
-    errors: dict[str, str] = {}
 
     status_value = str(form_data.get("status") or "ativo").strip().lower()
-    if status_value not in {"ativo", "rascunho", "arquivado"}:
+    if status_value not in FICHA_STATUSES:
         errors["status"] = "Status invalido"
     if not template:
         errors["template_id"] = "Template invalido"
@@ -684,18 +796,19 @@ async def fichas_importar_confirmar(job_id: str, request: Request, db: Session =
 
     extras_json: dict[str, Any] = {}
     if template_schema:
-        extras_json, extra_errors = parse_extras(form_data, template_schema)
+        extras_json, extra_errors = parse_extras(form_data, get_template_field_map(template))
         for key, value in extra_errors.items():
             errors[f"extra__{key}"] = value
 
     if errors:
+        templates_list = await db.run_sync(list_cached_templates, active_only=True)
         return templates.TemplateResponse(
             "fichas_importar_revisar.html",
             {
                 "request": request,
                 "user": user,
                 "job": job,
-                "document": db.execute(select(UploadedDocument).where(UploadedDocument.id == job.document_id)).scalar_one(),
+                "document": job.document,
                 "template": template,
                 "templates_list": templates_list,
                 "template_schema": template_schema,
@@ -709,39 +822,19 @@ async def fichas_importar_confirmar(job_id: str, request: Request, db: Session =
         )
 
     if not processo:
-        if base_fields.process_key:
-            processo = db.execute(
-                select(Process).where(Process.process_key == base_fields.process_key)
-            ).scalar_one_or_none()
-        if not processo and base_fields.tc_numero and base_fields.ano:
-            processo = db.execute(
-                select(Process).where(
-                    Process.tc_numero == base_fields.tc_numero,
-                    Process.ano == base_fields.ano,
-                )
-            ).scalar_one_or_none()
+        processo = await find_existing_process(db, base_fields)
 
     if not processo:
         try:
-            processo = create_process(db, base_fields.model_dump(), user)
+            processo = await db.run_sync(create_process, base_fields.model_dump(), user)
         except IntegrityError:
-            db.rollback()
-            if base_fields.process_key:
-                processo = db.execute(
-                    select(Process).where(Process.process_key == base_fields.process_key)
-                ).scalar_one_or_none()
-            if not processo and base_fields.tc_numero and base_fields.ano:
-                processo = db.execute(
-                    select(Process).where(
-                        Process.tc_numero == base_fields.tc_numero,
-                        Process.ano == base_fields.ano,
-                    )
-                ).scalar_one_or_none()
+            await db.rollback()
+            processo = await find_existing_process(db, base_fields)
             if not processo:
                 raise
 
-    ficha = create_ficha(
-        db,
+    ficha = await db.run_sync(
+        create_ficha,
         processo,
         template,
         base_fields.model_dump(),
@@ -755,19 +848,19 @@ async def fichas_importar_confirmar(job_id: str, request: Request, db: Session =
 
 
 @router.get("/fichas/nova")
-def ficha_nova(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-
+async def ficha_nova(
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
     process_id = request.query_params.get("process_id")
     template_id = request.query_params.get("template_id")
     manual = request.query_params.get("manual") == "1" and not process_id
-    processo = get_process(db, process_id) if process_id else None
-    template = get_template(db, template_id) if template_id else None
+    processo = await db.run_sync(get_process, process_id) if process_id else None
+    template = await db.run_sync(get_template, template_id) if template_id else None
     if manual and not template_id:
-        template = get_or_create_manual_template(db, user)
-    templates_list = list_templates(db, active_only=True)
+        template = await get_or_create_manual_template(db, user)
+    templates_list = await db.run_sync(list_cached_templates, active_only=True)
 
     process_filters = {
         "numero": request.query_params.get("numero"),
@@ -777,9 +870,9 @@ def ficha_nova(request: Request, db: Session = Depends(get_db)):
     }
     processos = []
     if not manual and not processo:
-        processos, _ = list_processes(db, process_filters, 1, 20)
+        processos, _ = await db.run_sync(list_processes, process_filters, 1, 20)
 
-    template_schema = normalize_template_schema(template.schema_json) if template else None
+    template_schema = get_template_schema(template) if template else None
     return templates.TemplateResponse(
         "ficha_form.html",
         {
@@ -799,25 +892,23 @@ def ficha_nova(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/fichas/nova")
-async def ficha_criar(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-
-    form = await request.form()
-    form_data = dict(form)
+async def ficha_criar(
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    form_data = await request.form()
     process_id = form_data.get("process_id")
     template_id = form_data.get("template_id") or request.query_params.get("template_id")
     manual = form_data.get("manual") == "1"
-    processo = get_process(db, process_id) if process_id else None
-    template = get_template(db, template_id) if template_id else None
+    processo = await db.run_sync(get_process, process_id) if process_id else None
+    template = await db.run_sync(get_template, template_id) if template_id else None
     if manual and not template_id:
-        template = get_or_create_manual_template(db, user)
-    templates_list = list_templates(db, active_only=True)
+        template = await get_or_create_manual_template(db, user)
 
     errors: dict[str, str] = {}
     status_value = str(form_data.get("status") or "ativo").strip().lower()
-    if status_value not in {"ativo", "rascunho", "arquivado"}:
+    if status_value not in FICHA_STATUSES:
         errors["status"] = "Status invalido"
     if not processo and not manual:
         errors["process_id"] = "Processo invalido"
@@ -833,12 +924,13 @@ async def ficha_criar(request: Request, db: Session = Depends(get_db)):
     extras_json: dict[str, Any] = {}
     template_schema: TemplateSchema | None = None
     if template and template.schema_json:
-        template_schema = normalize_template_schema(template.schema_json)
-        extras_json, extra_errors = parse_extras(form_data, template_schema)
+        template_schema = get_template_schema(template)
+        extras_json, extra_errors = parse_extras(form_data, get_template_field_map(template))
         for key, value in extra_errors.items():
             errors[f"extra__{key}"] = value
 
     if errors:
+        templates_list = await db.run_sync(list_cached_templates, active_only=True)
         return templates.TemplateResponse(
             "ficha_form.html",
             {
@@ -859,10 +951,10 @@ async def ficha_criar(request: Request, db: Session = Depends(get_db)):
         )
 
     if not processo:
-        processo = create_process(db, base_fields.model_dump(), user)
+        processo = await db.run_sync(create_process, base_fields.model_dump(), user)
 
-    ficha = create_ficha(
-        db,
+    ficha = await db.run_sync(
+        create_ficha,
         processo,
         template,
         base_fields.model_dump(),
@@ -876,31 +968,33 @@ async def ficha_criar(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/fichas/{ficha_id}")
-def ficha_detail(ficha_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    ficha = get_ficha(db, ficha_id)
+async def ficha_detail(
+    ficha_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    ficha = await db.run_sync(get_ficha, ficha_id)
     if not ficha:
-        return RedirectResponse(with_prefix("/fichas"), status_code=303)
-    template_schema = normalize_template_schema(ficha.template.schema_json)
-    extras_map = build_template_field_map(template_schema)
+        return RedirectResponse(_FICHAS_URL, status_code=303)
+    template_schema = get_template_schema(ficha.template)
+    extras_map = get_template_field_map(ficha.template)
     return templates.TemplateResponse(
         "ficha_detail.html",
         {"request": request, "user": user, "ficha": ficha, "template_schema": template_schema, "extras_map": extras_map},
     )
 
 
-@router.get("/fichas/{ficha_id}/editar")
-def ficha_editar(ficha_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    ficha = get_ficha(db, ficha_id)
-    if not ficha:
-        return RedirectResponse(with_prefix("/fichas"), status_code=303)
-    templates_list = list_templates(db, active_only=True)
-    template_schema = normalize_template_schema(ficha.template.schema_json)
+def _ficha_edit_response(
+    request: Request,
+    user: UserClaims,
+    ficha: Ficha,
+    templates_list: list[Row],
+    form: Any,
+    extras: dict[str, Any],
+    errors: dict[str, str],
+    status_code: int = 200,
+):
     return templates.TemplateResponse(
         "ficha_form.html",
         {
@@ -909,32 +1003,50 @@ def ficha_editar(ficha_id: str, request: Request, db: Session = Depends(get_db))
             "manual": False,
             "processo": ficha.process,
             "template": ficha.template,
-            "template_schema": template_schema,
+            "template_schema": get_template_schema(ficha.template),
             "templates_list": templates_list,
             "processos": [],
             "process_filters": {},
             "ficha": ficha,
-            "form": ficha.campos_base_json,
-            "extras": ficha.extras_json or {},
-            "errors": {},
+            "form": form,
+            "extras": extras,
+            "errors": errors,
         },
+        status_code=status_code,
+    )
+
+
+@router.get("/fichas/{ficha_id}/editar")
+async def ficha_editar(
+    ficha_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    ficha = await db.run_sync(get_ficha, ficha_id)
+    if not ficha:
+        return RedirectResponse(_FICHAS_URL, status_code=303)
+    templates_list = await db.run_sync(list_cached_templates, active_only=True)
+    return _ficha_edit_response(
+        request, user, ficha, templates_list, ficha.campos_base_json, ficha.extras_json or {}, {}
     )
 
 
 @router.post("/fichas/{ficha_id}/editar")
-async def ficha_atualizar(ficha_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    ficha = get_ficha(db, ficha_id)
+async def ficha_atualizar(
+    ficha_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    ficha = await db.run_sync(get_ficha, ficha_id)
     if not ficha:
-        return RedirectResponse(with_prefix("/fichas"), status_code=303)
+        return RedirectResponse(_FICHAS_URL, status_code=303)
 
-    form = await request.form()
-    form_data = dict(form)
+    form_data = await request.form()
     errors: dict[str, str] = {}
     status_value = str(form_data.get("status") or ficha.status or "ativo").strip().lower()
-    if status_value not in {"ativo", "rascunho", "arquivado"}:
+    if status_value not in FICHA_STATUSES:
         errors["status"] = "Status invalido"
 
     base_fields = None
@@ -943,35 +1055,16 @@ async def ficha_atualizar(ficha_id: str, request: Request, db: Session = Depends
     except ValidationError as exc:
         errors.update(validation_errors_to_dict(exc))
 
-    template_schema = normalize_template_schema(ficha.template.schema_json)
-    extras_json, extra_errors = parse_extras(form_data, template_schema)
+    extras_json, extra_errors = parse_extras(form_data, get_template_field_map(ficha.template))
     for key, value in extra_errors.items():
         errors[f"extra__{key}"] = value
 
     if errors:
-        templates_list = list_templates(db, active_only=True)
-        return templates.TemplateResponse(
-            "ficha_form.html",
-            {
-                "request": request,
-                "user": user,
-                "manual": False,
-                "processo": ficha.process,
-                "template": ficha.template,
-                "template_schema": template_schema,
-                "templates_list": templates_list,
-                "processos": [],
-                "process_filters": {},
-                "ficha": ficha,
-                "form": form_data,
-                "extras": extras_json,
-                "errors": errors,
-            },
-            status_code=400,
-        )
+        templates_list = await db.run_sync(list_cached_templates, active_only=True)
+        return _ficha_edit_response(request, user, ficha, templates_list, form_data, extras_json, errors, status_code=400)
 
-    ficha = update_ficha(
-        db,
+    ficha = await db.run_sync(
+        update_ficha,
         ficha,
         base_fields.model_dump(),
         extras_json,
@@ -984,15 +1077,17 @@ async def ficha_atualizar(ficha_id: str, request: Request, db: Session = Depends
 
 
 @router.post("/fichas/{ficha_id}/excluir")
-def ficha_excluir(ficha_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    ficha = get_ficha(db, ficha_id)
+async def ficha_excluir(
+    ficha_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    ficha = await db.run_sync(get_ficha, ficha_id)
     if not ficha:
-        return RedirectResponse(with_prefix("/fichas"), status_code=303)
-    delete_ficha(db, ficha, user)
-    return RedirectResponse(with_prefix("/fichas"), status_code=303)
+        return RedirectResponse(_FICHAS_URL, status_code=303)
+    await db.run_sync(delete_ficha, ficha, user)
+    return RedirectResponse(_FICHAS_URL, status_code=303)
 
 
 @router.post("/fichas/{ficha_id}/anexos")
@@ -1000,64 +1095,82 @@ async def ficha_anexar(
     ficha_id: str,
     request: Request,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    ficha = get_ficha(db, ficha_id)
-    if not ficha:
-        return RedirectResponse(with_prefix("/fichas"), status_code=303)
+    key = coerce_uuid(ficha_id)
+    if key is None or await db.scalar(select(Ficha.id).where(Ficha.id == key)) is None:
+        return RedirectResponse(_FICHAS_URL, status_code=303)
 
     if not file.filename:
-        return RedirectResponse(with_prefix(f"/fichas/{ficha.id}"), status_code=303)
+        return RedirectResponse(with_prefix(f"/fichas/{key}"), status_code=303)
 
     storage = get_storage_backend()
-    result = storage.save(file)
-    attachment = Attachment(
-        ficha_id=ficha.id,
-        filename=result.filename,
-        content_type=result.content_type,
-        size=result.size,
-        storage_key=result.storage_key,
+    result = await asyncio.to_thread(storage.save, file)
+    await db.execute(
+        insert(Attachment).values(
+            ficha_id=key,
+            filename=result.filename,
+            content_type=result.content_type,
+            size=result.size,
+            storage_key=result.storage_key,
+        )
     )
-    db.add(attachment)
-    db.commit()
-    return RedirectResponse(with_prefix(f"/fichas/{ficha.id}"), status_code=303)
+    await db.commit()
+    return RedirectResponse(with_prefix(f"/fichas/{key}"), status_code=303)
 
 
 @router.get("/anexos/{attachment_id}")
-def anexo_download(attachment_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db)
-    if isinstance(user, RedirectResponse):
-        return user
-    attachment = db.execute(select(Attachment).where(Attachment.id == attachment_id)).scalar_one_or_none()
+async def anexo_download(
+    attachment_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    key = coerce_uuid(attachment_id)
+    attachment = None
+    if key:
+        attachment = (
+            await db.execute(
+                select(
+                    Attachment.storage_key, Attachment.filename, Attachment.content_type, Attachment.size
+                ).where(Attachment.id == key)
+            )
+        ).first()
     if not attachment:
-        return RedirectResponse(with_prefix("/fichas"), status_code=303)
+        return RedirectResponse(_FICHAS_URL, status_code=303)
 
     storage = get_storage_backend()
     download_url = storage.get_download_url(attachment.storage_key, attachment.filename)
     if download_url:
-        return RedirectResponse(download_url, status_code=302)
+        return RedirectResponse(download_url, status_code=302, headers={"Cache-Control": "private, max-age=60"})
+
+    headers = {"Cache-Control": "private, max-age=3600", "ETag": f'"{attachment.storage_key}"'}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
 
     if hasattr(storage, "get_path"):
         return FileResponse(
             storage.get_path(attachment.storage_key),
             media_type=attachment.content_type,
             filename=attachment.filename,
+            headers=headers,
         )
 
     stream = storage.open(attachment.storage_key)
-    headers = {"Content-Disposition": f'attachment; filename="{attachment.filename}"'}
-    return StreamingResponse(stream, media_type=attachment.content_type, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{attachment.filename}"'
+    if attachment.size:
+        headers["Content-Length"] = str(attachment.size)
+    return StreamingResponse(iter_chunks(stream), media_type=attachment.content_type, headers=headers)
 
 
 @router.get("/admin/templates")
-def admin_templates_list(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db, admin=True)
-    if isinstance(user, RedirectResponse):
-        return user
-    templates_list = list_templates(db)
+async def admin_templates_list(
+    request: Request,
+    user: UserClaims = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    templates_list = await db.run_sync(list_cached_templates)
     return templates.TemplateResponse(
         "admin_templates_list.html",
         {"request": request, "user": user, "templates_list": templates_list},
@@ -1065,10 +1178,7 @@ def admin_templates_list(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/admin/templates/importar")
-def admin_template_import_page(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db, admin=True)
-    if isinstance(user, RedirectResponse):
-        return user
+async def admin_template_import_page(request: Request, user: UserClaims = Depends(require_admin)):
     return templates.TemplateResponse(
         "admin_template_import.html",
         {"request": request, "user": user, "errors": {}, "message": None},
@@ -1076,10 +1186,12 @@ def admin_template_import_page(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/admin/templates/importar")
-async def admin_template_import(request: Request, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    user = ensure_user(request, db, admin=True)
-    if isinstance(user, RedirectResponse):
-        return user
+async def admin_template_import(
+    request: Request,
+    file: UploadFile = File(...),
+    user: UserClaims = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
     if not file.filename:
         return templates.TemplateResponse(
             "admin_template_import.html",
@@ -1087,8 +1199,15 @@ async def admin_template_import(request: Request, file: UploadFile = File(...),
             status_code=400,
         )
 
+    if file.size is not None and file.size > int(settings.MAX_UPLOAD_MB) * 1024 * 1024:
+        return templates.TemplateResponse(
+            "admin_template_import.html",
+            {"request": request, "user": user, "errors": {"file": "Arquivo excede o limite permitido."}, "message": None},
+            status_code=400,
+        )
+
     try:
-        payload = json.loads((await file.read()).decode("utf-8"))
+        payload = orjson.loads(await file.read())
     except Exception:
         return templates.TemplateResponse(
             "admin_template_import.html",
@@ -1097,7 +1216,7 @@ async def admin_template_import(request: Request, file: UploadFile = File(...),
         )
 
     try:
-        template, created = import_template_payload(db, payload, user)
+        template, created = await db.run_sync(import_template_payload, payload, user)
     except Exception as exc:
         return templates.TemplateResponse(
             "admin_template_import.html",
@@ -1121,53 +1240,59 @@ async def admin_template_import(request: Request, file: UploadFile = File(...),
 
 
 @router.post("/admin/templates/{template_id}/status")
-async def admin_template_status(template_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db, admin=True)
-    if isinstance(user, RedirectResponse):
-        return user
-    template = get_template(db, template_id)
+async def admin_template_status(
+    template_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    template = await db.run_sync(get_template, template_id)
     if not template:
-        return RedirectResponse(with_prefix("/admin/templates"), status_code=303)
+        return RedirectResponse(_ADMIN_TEMPLATES_URL, status_code=303)
 
-    form = await request.form()
-    form_data = dict(form)
+    form_data = await request.form()
     active_raw = str(form_data.get("active", "")).strip().lower()
-    active = active_raw in {"1", "true", "on", "yes"}
-    set_template_active(db, template, active, user)
-    return RedirectResponse(with_prefix("/admin/templates"), status_code=303)
+    active = active_raw in TRUTHY_FORM_VALUES
+    await db.run_sync(set_template_active, template, active, user)
+    return RedirectResponse(_ADMIN_TEMPLATES_URL, status_code=303)
 
 
-@router.get("/admin/templates/novo")
-def admin_template_novo(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db, admin=True)
-    if isinstance(user, RedirectResponse):
-        return user
+def _template_form_response(
+    request: Request,
+    user: UserClaims,
+    template: FichaTemplate | None,
+    form: Any,
+    errors: dict[str, str],
+    status_code: int = 200,
+):
     return templates.TemplateResponse(
         "admin_template_form.html",
-        {"request": request, "user": user, "template": None, "form": {}, "errors": {}},
+        {"request": request, "user": user, "template": template, "form": form, "errors": errors},
+        status_code=status_code,
     )
 
 
+@router.get("/admin/templates/novo")
+async def admin_template_novo(request: Request, user: UserClaims = Depends(require_admin)):
+    return _template_form_response(request, user, None, {}, {})
+
+
 @router.post("/admin/templates/novo")
-async def admin_template_criar(request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db, admin=True)
-    if isinstance(user, RedirectResponse):
-        return user
-    form = await request.form()
-    form_data = dict(form)
+async def admin_template_criar(
+    request: Request,
+    user: UserClaims = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    form_data = await request.form()
     try:
         data = TemplateForm.model_validate(form_data)
     except ValidationError as exc:
         errors = validation_errors_to_dict(exc)
-        return templates.TemplateResponse(
-            "admin_template_form.html",
-            {"request": request, "user": user, "template": None, "form": form_data, "errors": errors},
-            status_code=400,
-        )
+        return _template_form_response(request, user, None, form_data, errors, status_code=400)
 
     try:
-        template = create_template(
-            db,
+        template = await db.run_sync(
+            create_template,
             data.nome,
             data.descricao,
             data.schema_text,
@@ -1180,67 +1305,59 @@ async def admin_template_criar(request: Request, db: Session = Depends(get_db)):
         errors = {"schema_text": "Schema JSON invalido"}
         if "versao" in str(exc).lower():
             errors = {"versao": str(exc)}
-        return templates.TemplateResponse(
-            "admin_template_form.html",
-            {"request": request, "user": user, "template": None, "form": form_data, "errors": errors},
-            status_code=400,
-        )
+        return _template_form_response(request, user, None, form_data, errors, status_code=400)
 
     return RedirectResponse(with_prefix(f"/admin/templates/{template.id}/editar"), status_code=303)
 
 
 @router.get("/admin/templates/{template_id}/editar")
-def admin_template_editar(template_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db, admin=True)
-    if isinstance(user, RedirectResponse):
-        return user
-    template = get_template(db, template_id)
+async def admin_template_editar(
+    template_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    template = await db.run_sync(get_template, template_id)
     if not template:
-        return RedirectResponse(with_prefix("/admin/templates"), status_code=303)
-    return templates.TemplateResponse(
-        "admin_template_form.html",
-        {
-            "request": request,
-            "user": user,
-            "template": template,
-            "form": {
-                "nome": template.nome,
-                "descricao": template.descricao,
-                "origem_pdf": template.origem_pdf,
-                "is_active": template.is_active,
-                "schema_text": json.dumps(template.schema_json, indent=2),
-            },
-            "errors": {},
-        },
-    )
+        return RedirectResponse(_ADMIN_TEMPLATES_URL, status_code=303)
+    form = {
+        "nome": template.nome,
+        "descricao": template.descricao,
+        "origem_pdf": template.origem_pdf,
+        "is_active": template.is_active,
+        "schema_text": get_template_schema_text(template),
+    }
+    return _template_form_response(request, user, template, form, {})
 
 
 @router.post("/admin/templates/{template_id}/editar")
-async def admin_template_atualizar(template_id: str, request: Request, db: Session = Depends(get_db)):
-    user = ensure_user(request, db, admin=True)
-    if isinstance(user, RedirectResponse):
-        return user
-    template = get_template(db, template_id)
+async def admin_template_atualizar(
+    template_id: str,
+    request: Request,
+    user: UserClaims = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    template = await db.run_sync(get_template, template_id)
     if not template:
-        return RedirectResponse(with_prefix("/admin/templates"), status_code=303)
+        return RedirectResponse(_ADMIN_TEMPLATES_URL, status_code=303)
+
+    form_data = await request.form()
+    raw_versao = str(form_data.get("versao") or "").strip()
+    if raw_versao.isdigit() and 0 < int(raw_versao) <= template.versao:
+        errors = {"versao": "Versao deve ser maior que a atual"}
+        return _template_form_response(request, user, template, form_data, errors, status_code=400)
 
-    form = await request.form()
-    form_data = dict(form)
     try:
         data = TemplateForm.model_validate(form_data)
     except ValidationError as exc:
         errors = validation_errors_to_dict(exc)
-        return templates.TemplateResponse(
-            "admin_template_form.html",
-            {"request": request, "user": user, "template": template, "form": form_data, "errors": errors},
-            status_code=400,
-        )
+        return _template_form_response(request, user, template, form_data, errors, status_code=400)
 
     try:
         if data.versao and data.versao <= template.versao:
             raise ValueError("Versao deve ser maior que a atual")
-        template = create_template_version(
-            db,
+        template = await db.run_sync(
+            create_template_version,
             template,
             data.nome,
             data.descricao,
@@ -1254,10 +1371,6 @@ async def admin_template_atualizar(template_id: str, request: Request, db: Sessi
         errors = {"schema_text": "Schema JSON invalido"}
         if "versao" in str(exc).lower():
             errors = {"versao": str(exc)}
-        return templates.TemplateResponse(
-            "admin_template_form.html",
-            {"request": request, "user": user, "template": template, "form": form_data, "errors": errors},
-            status_code=400,
-        )
+        return _template_form_response(request, user, template, form_data, errors, status_code=400)
 
     return RedirectResponse(with_prefix(f"/admin/templates/{template.id}/editar"), status_code=303)
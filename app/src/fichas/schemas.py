@@ -211,6 +211,30 @@ class LoginForm(BaseModel):
     password: str
 
 
+MAX_PAGE_SIZE = 200
+
+
+class ProcessListQuery(BaseModel):
+    page: int = Field(default=1, ge=1)
+    page_size: int = Field(default=20, ge=1, le=MAX_PAGE_SIZE)
+    cursor: str | None = None
+    numero: str | None = None
+    ano: int | None = None
+    interessado: str | None = None
+    assunto: str | None = None
+
+    def filters(self) -> dict[str, Any]:
+        return self.model_dump(exclude={"page", "page_size", "cursor"})
+
+
+class FichaListQuery(ProcessListQuery):
+    q: str | None = None
+    template_id: uuid.UUID | None = None
+    status: str | None = None
+    data_inicio: date | None = None
+    data_fim: date | None = None
+
+
 class ProcessOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from cachetools import TTLCache
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fichas.models import Ficha, FichaTemplate, Process
+from fichas.settings import settings
+
+
+class ProcessSummary(NamedTuple):
+    id: uuid.UUID
+    process_key: str | None
+    tc_numero: str | None
+    ano: int | None
+
+
+class TemplateSummary(NamedTuple):
+    nome: str
+    versao: int
+
+
+class RecentFicha(NamedTuple):
+    id: uuid.UUID
+    status: str
+    created_at: datetime
+    process: ProcessSummary
+    template: TemplateSummary
+
+
+_generation = 0
+_dashboard_cache: TTLCache[int, dict[str, Any]] = TTLCache(maxsize=1, ttl=settings.DASHBOARD_CACHE_SECONDS)
+_dashboard_lock = asyncio.Lock()
+
+
+def bump_dashboard_generation() -> None:
+    global _generation
+    _generation += 1
+
+
+def clear_dashboard_cache() -> None:
+    _dashboard_cache.clear()
+
+
+async def _fetch_dashboard(db: AsyncSession) -> dict[str, Any]:
+    totals = await db.execute(
+        select(
+            select(func.count()).select_from(Process).scalar_subquery().label("processos"),
+            select(func.count()).select_from(Ficha).scalar_subquery().label("fichas"),
+            select(func.count()).select_from(FichaTemplate).scalar_subquery().label("templates"),
+        )
+    )
+    processos_total, fichas_total, templates_total = totals.one()
+    active_templates = (
+        await db.execute(
+            select(FichaTemplate.id, FichaTemplate.nome, FichaTemplate.versao, FichaTemplate.descricao)
+            .where(FichaTemplate.is_active.is_(True))
+            .order_by(FichaTemplate.nome.asc(), FichaTemplate.versao.desc())
+            .limit(6)
+        )
+    ).all()
+    recent_rows = await db.execute(
+        select(
+            Ficha.id,
+            Ficha.status,
+            Ficha.created_at,
+            Process.id,
+            Process.process_key,
+            Process.tc_numero,
+            Process.ano,
+            FichaTemplate.nome,
+            FichaTemplate.versao,
+        )
+        .join(Process, Ficha.process_id == Process.id)
+        .join(FichaTemplate, Ficha.template_id == FichaTemplate.id)
+        .order_by(Ficha.created_at.desc())
+        .limit(5)
+    )
+    recent_fichas = [
+        RecentFicha(
+            ficha_id,
+            status,
+            created_at,
+            ProcessSummary(process_id, process_key, tc_numero, ano),
+            TemplateSummary(nome, versao),
+        )
+        for ficha_id, status, created_at, process_id, process_key, tc_numero, ano, nome, versao in recent_rows
+    ]
+    return {
+        "processos_total": processos_total,
+        "fichas_total": fichas_total,
+        "templates_total": templates_total,
+        "active_templates": tuple(active_templates),
+        "recent_fichas": tuple(recent_fichas),
+    }
+
+
+async def get_dashboard_summary(db: AsyncSession) -> dict[str, Any]:
+    generation = _generation
+    cached = _dashboard_cache.get(generation)
+    if cached is not None:
+        return cached
+    async with _dashboard_lock:
+        cached = _dashboard_cache.get(generation)
+        if cached is not None:
+            return cached
+        summary = await _fetch_dashboard(db)
+        if generation == _generation:
+            _dashboard_cache[generation] = summary
+        return summary
@@ -3,14 +3,18 @@ from __future__ import annotations
 from datetime import date, datetime
 from decimal import Decimal
 import re
+import uuid
 from typing import Any, Mapping
 
-from sqlalchemy import func, or_, select
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, selectinload
 
 from fichas.audit import log_action, model_to_dict
-from fichas.models import Ficha, FichaTemplate, Process
-from fichas.schemas import TemplateField, TemplateSchema, flatten_template_fields
+from fichas.db import page_statement, page_total, page_total_async, strict_load_options
+from fichas.models import Ficha, FichaTemplate, Process, coerce_uuid
+from fichas.schemas import TemplateField
+from fichas.services.dashboard_service import bump_dashboard_generation
 
 
 def _normalize_json(value: Any) -> Any:
@@ -63,51 +67,49 @@ def _validate_field_value(field: TemplateField, value: Any) -> str | None:
     return None
 
 
-def parse_extras(form: Mapping[str, Any], schema: TemplateSchema) -> tuple[dict[str, Any], dict[str, str]]:
+def parse_extras(form: Mapping[str, Any], field_map: Mapping[str, TemplateField]) -> tuple[dict[str, Any], dict[str, str]]:
     extras: dict[str, Any] = {}
     errors: dict[str, str] = {}
 
-    for field in flatten_template_fields(schema):
-        key = f"extra__{field.field_id}"
-        raw = form.get(key)
+    for field_id, field in field_map.items():
+        raw = form.get(f"extra__{field_id}")
         if isinstance(raw, list):
             raw = raw[0]
+        text = "" if raw is None else str(raw).strip()
 
-        if raw is None or str(raw).strip() == "":
+        if not text:
             if field.required:
-                errors[field.field_id] = "Obrigatorio"
+                errors[field_id] = "Obrigatorio"
             else:
-                extras[field.field_id] = None
+                extras[field_id] = None
             continue
 
         try:
             if field.type in {"number", "currency"}:
-                extras[field.field_id] = float(_parse_decimal(str(raw)))
+                value = float(_parse_decimal(text))
             elif field.type == "date":
-                extras[field.field_id] = date.fromisoformat(str(raw)).isoformat()
+                value = date.fromisoformat(text).isoformat()
             elif field.type == "boolean":
-                extras[field.field_id] = _parse_bool(str(raw))
+                value = _parse_bool(text)
             elif field.type == "enum":
-                value = str(raw).strip()
-                if field.options and value not in field.options:
+                if field.options and text not in field.options:
                     raise ValueError("Opcao invalida")
-                extras[field.field_id] = value
+                value = text
             else:
-                extras[field.field_id] = str(raw).strip()
+                value = text
         except ValueError:
-            errors[field.field_id] = "Valor invalido"
+            errors[field_id] = "Valor invalido"
             continue
 
-        error = _validate_field_value(field, extras[field.field_id])
+        extras[field_id] = value
+        error = _validate_field_value(field, value)
         if error:
-            errors[field.field_id] = error
+            errors[field_id] = error
 
     return extras, errors
 
 
-def list_fichas(db: Session, filters: dict[str, Any], page: int, page_size: int) -> tuple[list[Ficha], int]:
-    query = select(Ficha).join(Process).join(FichaTemplate)
-
+def _filtered_fichas(query, filters: dict[str, Any]):
     query_text = filters.get("q")
     if query_text:
         like = f"%{query_text}%"
@@ -160,17 +162,46 @@ def list_fichas(db: Session, filters: dict[str, Any], page: int, page_size: int)
     if data_fim:
         query = query.where(Process.data <= data_fim)
 
-    total = db.execute(select(func.count()).select_from(query.subquery())).scalar_one()
-    items = (
-        db.execute(query.order_by(Ficha.created_at.desc()).offset((page - 1) * page_size).limit(page_size))
-        .scalars()
-        .all()
+    return query
+
+
+def list_fichas(db: Session, filters: dict[str, Any], page: int, page_size: int) -> tuple[list[Ficha], int]:
+    query = _filtered_fichas(
+        select(Ficha)
+        .join(Process)
+        .join(FichaTemplate)
+        .options(*strict_load_options(contains_eager(Ficha.process), contains_eager(Ficha.template))),
+        filters,
     )
-    return items, total
+    rows = db.execute(page_statement(Ficha, query, page, page_size, with_total=True)).all()
+    return [row[0] for row in rows], page_total(db, query, rows, page)
+
+
+async def list_ficha_rows(
+    db: AsyncSession,
+    filters: dict[str, Any],
+    page: int,
+    page_size: int,
+    columns: list[str],
+    after: tuple[datetime, uuid.UUID] | None = None,
+    count: bool = True,
+) -> tuple[list[Mapping[str, Any]], int | None]:
+    query = _filtered_fichas(select(*(getattr(Ficha, name) for name in columns)).join(Process), filters)
+    rows = (await db.execute(page_statement(Ficha, query, page, page_size, after, with_total=count))).all()
+    total = await page_total_async(db, query, rows, page) if count else None
+    return [dict(zip(columns, row)) for row in rows], total
 
 
 def get_ficha(db: Session, ficha_id):
-    return db.execute(select(Ficha).where(Ficha.id == ficha_id)).scalar_one_or_none()
+    key = coerce_uuid(ficha_id)
+    if not key:
+        return None
+    options = strict_load_options(
+        selectinload(Ficha.process),
+        selectinload(Ficha.template),
+        selectinload(Ficha.attachments),
+    )
+    return db.get(Ficha, key, options=options)
 
 
 def create_ficha(
@@ -200,6 +231,7 @@ def create_ficha(
     db.flush()
     log_action(db, user, "create", "ficha", str(ficha.id), None, model_to_dict(ficha))
     db.commit()
+    bump_dashboard_generation()
     db.refresh(ficha)
     return ficha
 
@@ -234,5 +266,6 @@ def update_ficha(
 def delete_ficha(db: Session, ficha: Ficha, user) -> None:
     before = model_to_dict(ficha)
     db.delete(ficha)
-    log_action(db, user, "delete", "ficha", str(ficha.id), before, None)
+    log_action(db, user, "delete", "ficha", str(ficha.id), before, None, durable=True)
     db.commit()
+    bump_dashboard_generation()
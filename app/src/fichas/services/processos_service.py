@@ -1,22 +1,20 @@
 from __future__ import annotations
 
-from typing import Any
+from datetime import datetime
+from typing import Any, Mapping
+import uuid
 
-from sqlalchemy import func, or_, select
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from fichas.audit import log_action, model_to_dict
-from fichas.models import Process
+from fichas.db import page_statement, page_total, page_total_async
+from fichas.models import Process, coerce_uuid
+from fichas.services.dashboard_service import bump_dashboard_generation
 
 
-def list_processes(
-    db: Session,
-    filters: dict[str, Any],
-    page: int,
-    page_size: int,
-) -> tuple[list[Process], int]:
-    query = select(Process)
-
+def _filtered_processes(query, filters: dict[str, Any]):
     numero = filters.get("numero")
     if numero:
         like = f"%{numero}%"
@@ -34,19 +32,43 @@ def list_processes(
     if assunto:
         query = query.where(Process.assunto.ilike(f"%{assunto}%"))
 
-    total = db.execute(select(func.count()).select_from(query.subquery())).scalar_one()
-    items = (
-        db.execute(
-            query.order_by(Process.created_at.desc()).offset((page - 1) * page_size).limit(page_size)
-        )
-        .scalars()
-        .all()
-    )
-    return items, total
+    return query
+
+
+def list_processes(
+    db: Session,
+    filters: dict[str, Any],
+    page: int,
+    page_size: int,
+) -> tuple[list[Process], int]:
+    query = _filtered_processes(select(Process), filters)
+    rows = db.execute(page_statement(Process, query, page, page_size, with_total=True)).all()
+    return [row[0] for row in rows], page_total(db, query, rows, page)
+
+
+async def list_process_rows(
+    db: AsyncSession,
+    filters: dict[str, Any],
+    page: int,
+    page_size: int,
+    columns: list[str],
+    after: tuple[datetime, uuid.UUID] | None = None,
+    count: bool = True,
+) -> tuple[list[Mapping[str, Any]], int | None]:
+    query = _filtered_processes(select(*(getattr(Process, name) for name in columns)), filters)
+    rows = (await db.execute(page_statement(Process, query, page, page_size, after, with_total=count))).all()
+    total = await page_total_async(db, query, rows, page) if count else None
+    return [dict(zip(columns, row)) for row in rows], total
 
 
 def get_process(db: Session, process_id):
-    return db.execute(select(Process).where(Process.id == process_id)).scalar_one_or_none()
+    key = coerce_uuid(process_id)
+    return db.get(Process, key) if key else None
+
+
+async def get_process_async(db: AsyncSession, process_id):
+    key = coerce_uuid(process_id)
+    return await db.get(Process, key) if key else None
 
 
 def create_process(db: Session, data: dict[str, Any], user):
@@ -55,6 +77,7 @@ def create_process(db: Session, data: dict[str, Any], user):
     db.flush()
     log_action(db, user, "create", "process", str(process.id), None, model_to_dict(process))
     db.commit()
+    bump_dashboard_generation()
     db.refresh(process)
     return process
 
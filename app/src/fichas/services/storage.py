@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import mimetypes
 import uuid
 from pathlib import Path
@@ -11,6 +12,7 @@ from fichas.models import UploadedDocument
 from fichas.settings import settings
 
 ALLOWED_CONTENT_TYPES = {"application/pdf"}
+GENERIC_CONTENT_TYPES = frozenset({"application/octet-stream", "binary/octet-stream"})
 ALLOWED_EXTENSIONS = {
     ".pdf",
     ".jpg",
@@ -62,7 +64,7 @@ def _is_allowed(content_type: str | None, filename: str | None, header: bytes |
     if content_type:
         if content_type in ALLOWED_CONTENT_TYPES or content_type.startswith("image/"):
             return True
-        if content_type not in {"application/octet-stream", "binary/octet-stream"}:
+        if content_type not in GENERIC_CONTENT_TYPES:
             if header and _sniff_image_mime(header):
                 return True
             return False
@@ -98,7 +100,7 @@ def save_upload(upload: UploadFile, user_id, db: Session) -> UploadedDocument:
     sniffed_mime = _sniff_image_mime(header)
     effective_type = content_type
     if sniffed_mime:
-        if not effective_type or effective_type in {"application/octet-stream", "binary/octet-stream"}:
+        if not effective_type or effective_type in GENERIC_CONTENT_TYPES:
             effective_type = sniffed_mime
         elif not effective_type.startswith("image/") and effective_type not in ALLOWED_CONTENT_TYPES:
             effective_type = sniffed_mime
@@ -118,6 +120,7 @@ def save_upload(upload: UploadFile, user_id, db: Session) -> UploadedDocument:
         raise ValueError("Caminho de upload invalido.")
 
     size = 0
+    digest = hashlib.sha256()
     try:
         with file_path.open("wb") as handle:
             while True:
@@ -127,6 +130,7 @@ def save_upload(upload: UploadFile, user_id, db: Session) -> UploadedDocument:
                 size += len(chunk)
                 if size > max_bytes:
                     raise ValueError("Arquivo excede o limite permitido.")
+                digest.update(chunk)
                 handle.write(chunk)
     except Exception:
         if file_path.exists():
@@ -138,6 +142,8 @@ def save_upload(upload: UploadFile, user_id, db: Session) -> UploadedDocument:
         original_filename=original_name,
         content_type=effective_type or content_type,
         storage_path=filename,
+        size=size,
+        sha256=digest.hexdigest(),
     )
     db.add(document)
     db.commit()
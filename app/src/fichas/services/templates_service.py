@@ -1,13 +1,73 @@
 from __future__ import annotations
 
-from typing import Any
+import hashlib
+import json
+from typing import Any, Iterable
 
+from cachetools import LRUCache, TTLCache
 from sqlalchemy import func, select, update
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
 from fichas.audit import log_action, model_to_dict
 from fichas.models import FichaTemplate
-from fichas.schemas import TemplateDraft, TemplateSchema, normalize_template_schema, parse_template_schema
+from fichas.schemas import (
+    TemplateDraft,
+    TemplateField,
+    TemplateSchema,
+    build_template_field_map,
+    normalize_template_schema,
+    parse_template_schema,
+)
+from fichas.services.dashboard_service import bump_dashboard_generation
+from fichas.settings import settings
+
+
+_TEMPLATE_LIST_COLUMNS = (
+    FichaTemplate.id,
+    FichaTemplate.nome,
+    FichaTemplate.versao,
+    FichaTemplate.is_active,
+    FichaTemplate.origem_pdf,
+    FichaTemplate.descricao,
+)
+_templates_cache: TTLCache[bool, tuple[Row, ...]] = TTLCache(
+    maxsize=2, ttl=settings.TEMPLATE_LIST_CACHE_SECONDS
+)
+_template_schema_cache: LRUCache[tuple, tuple[TemplateSchema, dict[str, TemplateField]]] = LRUCache(maxsize=256)
+_template_schema_text_cache: LRUCache[tuple, str] = LRUCache(maxsize=64)
+
+
+def _compiled_schema(template: FichaTemplate) -> tuple[TemplateSchema, dict[str, TemplateField]]:
+    key = (template.id, template.versao, template.updated_at)
+    compiled = _template_schema_cache.get(key)
+    if compiled is None:
+        schema = normalize_template_schema(template.schema_json)
+        compiled = (schema, build_template_field_map(schema))
+        _template_schema_cache[key] = compiled
+    return compiled
+
+
+def get_template_schema_text(template: FichaTemplate) -> str:
+    key = (template.id, template.versao, template.updated_at)
+    text = _template_schema_text_cache.get(key)
+    if text is None:
+        text = json.dumps(template.schema_json, indent=2)
+        _template_schema_text_cache[key] = text
+    return text
+
+
+def get_template_schema(template: FichaTemplate) -> TemplateSchema:
+    return _compiled_schema(template)[0]
+
+
+def get_template_field_map(template: FichaTemplate) -> dict[str, TemplateField]:
+    return _compiled_schema(template)[1]
+
+
+def clear_template_schema_cache() -> None:
+    _template_schema_cache.clear()
+    _template_schema_text_cache.clear()
 
 
 def list_templates(db: Session, active_only: bool | None = None) -> list[FichaTemplate]:
@@ -18,6 +78,28 @@ def list_templates(db: Session, active_only: bool | None = None) -> list[FichaTe
     return db.execute(query).scalars().all()
 
 
+def list_cached_templates(db: Session, active_only: bool = False) -> list[Row]:
+    cached = _templates_cache.get(active_only)
+    if cached is None:
+        query = select(*_TEMPLATE_LIST_COLUMNS)
+        if active_only:
+            query = query.where(FichaTemplate.is_active.is_(True))
+        query = query.order_by(FichaTemplate.nome.asc(), FichaTemplate.versao.desc())
+        cached = tuple(db.execute(query).all())
+        _templates_cache[active_only] = cached
+    return list(cached)
+
+
+def clear_templates_cache() -> None:
+    _templates_cache.clear()
+
+
+def template_list_etag(db: Session) -> str:
+    latest, total = db.execute(select(func.max(FichaTemplate.updated_at), func.count(FichaTemplate.id))).one()
+    digest = hashlib.sha1(f"{latest}|{total}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
 def get_template(db: Session, template_id):
     return db.execute(select(FichaTemplate).where(FichaTemplate.id == template_id)).scalar_one_or_none()
 
@@ -42,7 +124,7 @@ def _deactivate_other_versions(db: Session, nome: str, keep_id) -> None:
     )
 
 
-def create_template(
+def _add_template(
     db: Session,
     nome: str,
     descricao: str | None,
@@ -51,7 +133,7 @@ def create_template(
     origem_pdf: str | None = None,
     versao: int | None = None,
     is_active: bool = True,
-):
+) -> FichaTemplate:
     schema = _load_schema(schema_input)
     versao = versao or (get_latest_version(db, nome) + 1)
     exists = (
@@ -70,10 +152,35 @@ def create_template(
     )
     db.add(template)
     db.flush()
-    log_action(db, user, "create", "template", str(template.id), None, model_to_dict(template))
+    log_action(db, user, "create", "template", str(template.id), None, model_to_dict(template), durable=True)
     if is_active:
         _deactivate_other_versions(db, nome, template.id)
+    return template
+
+
+def create_template(
+    db: Session,
+    nome: str,
+    descricao: str | None,
+    schema_input: str | dict[str, Any] | TemplateSchema,
+    user,
+    origem_pdf: str | None = None,
+    versao: int | None = None,
+    is_active: bool = True,
+):
+    template = _add_template(
+        db,
+        nome,
+        descricao,
+        schema_input,
+        user,
+        origem_pdf=origem_pdf,
+        versao=versao,
+        is_active=is_active,
+    )
     db.commit()
+    bump_dashboard_generation()
+    clear_templates_cache()
     db.refresh(template)
     return template
 
@@ -109,13 +216,15 @@ def set_template_active(db: Session, template: FichaTemplate, active: bool, user
     if active:
         _deactivate_other_versions(db, template.nome, template.id)
     after = model_to_dict(template)
-    log_action(db, user, "update", "template", str(template.id), before, after)
+    log_action(db, user, "update", "template", str(template.id), before, after, durable=True)
     db.commit()
+    bump_dashboard_generation()
+    clear_templates_cache()
     db.refresh(template)
     return template
 
 
-def import_template_payload(db: Session, payload: dict[str, Any], user, replace_existing: bool = False):
+def _import_payload(db: Session, payload: dict[str, Any], user, replace_existing: bool) -> tuple[FichaTemplate, bool]:
     draft = TemplateDraft.model_validate(payload)
     schema = TemplateSchema(sections=draft.sections)
     versao = draft.versao or (get_latest_version(db, draft.nome) + 1)
@@ -134,13 +243,12 @@ def import_template_payload(db: Session, payload: dict[str, Any], user, replace_
         db.add(existing)
         db.flush()
         after = model_to_dict(existing)
-        log_action(db, user, "update", "template", str(existing.id), before, after)
+        log_action(db, user, "update", "template", str(existing.id), before, after, durable=True)
+        clear_template_schema_cache()
         if existing.is_active:
             _deactivate_other_versions(db, existing.nome, existing.id)
-        db.commit()
-        db.refresh(existing)
         return existing, True
-    template = create_template(
+    template = _add_template(
         db,
         nome=draft.nome,
         descricao=draft.descricao,
@@ -151,3 +259,33 @@ def import_template_payload(db: Session, payload: dict[str, Any], user, replace_
         is_active=draft.is_active,
     )
     return template, True
+
+
+def import_template_payload(db: Session, payload: dict[str, Any], user, replace_existing: bool = False):
+    template, changed = _import_payload(db, payload, user, replace_existing)
+    if changed:
+        db.commit()
+        bump_dashboard_generation()
+        clear_templates_cache()
+        db.refresh(template)
+    return template, changed
+
+
+def import_template_payloads(
+    db: Session,
+    payloads: Iterable[dict[str, Any]],
+    user,
+    replace_existing: bool = False,
+) -> list[tuple[FichaTemplate, bool]]:
+    results = [_import_payload(db, payload, user, replace_existing) for payload in payloads]
+    changed_ids = [template.id for template, changed in results if changed]
+    if changed_ids:
+        db.commit()
+        bump_dashboard_generation()
+        clear_templates_cache()
+        db.execute(
+            select(FichaTemplate)
+            .where(FichaTemplate.id.in_(changed_ids))
+            .execution_options(populate_existing=True)
+        ).scalars().all()
+    return results
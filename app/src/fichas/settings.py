@@ -8,6 +8,10 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=(".env", "../.env"), env_file_encoding="utf-8")
 
     DATABASE_URL: str = "postgresql+psycopg://fichas:fichas@db:5432/fichas"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DATABASE_READ_URL: str | None = None
     SECRET_KEY: str = "change-me"
     STORAGE_BACKEND: str = "local"
     LOCAL_STORAGE_PATH: str = "./data/uploads"
@@ -31,6 +35,14 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     COOKIE_SECURE: bool = False
     SESSION_EXPIRES_SECONDS: int = 60 * 60 * 12
+    SESSION_USER_CACHE_TTL_SECONDS: int = 30
+    TEMPLATE_LIST_CACHE_SECONDS: int = 30
+    DASHBOARD_CACHE_SECONDS: int = 10
+    FICHAS_RAISELOAD: bool = False
+    TEMPLATES_AUTO_RELOAD: bool = False
+    JINJA_BYTECODE_CACHE_DIR: str | None = None
+    AUDIT_BACKGROUND_WRITES: bool = True
+    AUDIT_DRAIN_TIMEOUT_SECONDS: float = 10
     PAGINATION_PAGE_SIZE: int = 20
     APP_BASE_PATH: str = ""
 
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import BinaryIO
+from typing import BinaryIO, Iterator
 
 from fastapi import UploadFile
 
+CHUNK_SIZE = 1024 * 1024
+
 
 @dataclass
 class StorageSaveResult:
@@ -22,6 +24,14 @@ def safe_filename(filename: str) -> str:
     return filename
 
 
+def iter_chunks(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    try:
+        while chunk := stream.read(chunk_size):
+            yield chunk
+    finally:
+        stream.close()
+
+
 class StorageBackend:
     def save(self, upload: UploadFile) -> StorageSaveResult:  # pragma: no cover - interface
         raise NotImplementedError
@@ -6,7 +6,7 @@ from uuid import uuid4
 
 from fastapi import UploadFile
 
-from fichas.storage.base import StorageBackend, StorageSaveResult, safe_filename
+from fichas.storage.base import CHUNK_SIZE, StorageBackend, StorageSaveResult, safe_filename
 
 
 class LocalStorage(StorageBackend):
@@ -20,7 +20,7 @@ class LocalStorage(StorageBackend):
         destination = self.base_path / storage_key
 
         with destination.open("wb") as buffer:
-            shutil.copyfileobj(upload.file, buffer)
+            shutil.copyfileobj(upload.file, buffer, length=CHUNK_SIZE)
 
         size = destination.stat().st_size
         content_type = upload.content_type or "application/octet-stream"
@@ -17,7 +17,11 @@ def process_ocr_job(job_id: str) -> None:
     db = SessionLocal()
     job = None
     try:
-        job = db.execute(select(OcrJob).where(OcrJob.id == job_id)).scalar_one_or_none()
+        job = db.execute(
+            select(OcrJob)
+            .where(OcrJob.id == job_id, OcrJob.status == "queued")
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
         if not job:
             return
         job.status = "processing"
@@ -9,10 +9,16 @@ os.environ["SECRET_KEY"] = "test-secret"
 os.environ["STORAGE_BACKEND"] = "local"
 os.environ["LOCAL_STORAGE_PATH"] = str(Path(__file__).parent / "data")
 os.environ["COOKIE_SECURE"] = "false"
+os.environ["AUDIT_BACKGROUND_WRITES"] = "false"
+os.environ["FICHAS_RAISELOAD"] = "true"
 
+from fichas.auth import clear_user_cache
 from fichas.db import SessionLocal, engine, get_db
 from fichas.main import app
 from fichas.models import Base
+from fichas.routes.api import clear_template_list_cache
+from fichas.services.dashboard_service import clear_dashboard_cache
+from fichas.services.templates_service import clear_templates_cache, clear_template_schema_cache
 from fichas.settings import settings
 
 settings.COOKIE_SECURE = False
@@ -22,6 +28,11 @@ settings.COOKIE_SECURE = False
 def reset_db():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    clear_user_cache()
+    clear_template_list_cache()
+    clear_dashboard_cache()
+    clear_template_schema_cache()
+    clear_templates_cache()
     yield
 
 
@@ -0,0 +1,150 @@
+from fichas.auth import get_password_hash
+from fichas.models import Ficha, FichaTemplate, Process, User
+
+
+def login(client, db_session):
+    user = User(email="admin@test.com", hashed_password=get_password_hash("secret"), is_admin=True)
+    db_session.add(user)
+    db_session.commit()
+    response = client.post("/login", data={"email": "admin@test.com", "password": "secret"}, follow_redirects=False)
+    assert response.status_code == 303
+    return response.cookies
+
+
+def test_api_requires_session(client):
+    response = client.get("/api/v1/processos")
+    assert response.status_code == 401
+
+
+def test_api_list_processes(client, db_session):
+    cookies = login(client, db_session)
+    db_session.add(Process(process_key="PROC-API", tc_numero="TC1", ano=2024))
+    db_session.commit()
+
+    response = client.get("/api/v1/processos", cookies=cookies)
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["total"] == 1
+    assert payload["items"][0]["process_key"] == "PROC-API"
+    assert isinstance(payload["items"][0]["id"], str)
+
+
+def test_api_list_fichas_empty_page(client, db_session):
+    cookies = login(client, db_session)
+
+    response = client.get("/api/v1/fichas?page=2&page_size=5", cookies=cookies)
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [],
+        "total": 0,
+        "page": 2,
+        "page_size": 5,
+        "next_cursor": None,
+    }
+
+
+def test_api_list_fichas_filters_by_process(client, db_session):
+    cookies = login(client, db_session)
+    template = FichaTemplate(nome="Template API", descricao="", versao=1, is_active=True, schema_json={"sections": []})
+    first = Process(process_key="PROC-A", tc_numero="TC-A", ano=2023)
+    second = Process(process_key="PROC-B", tc_numero="TC-B", ano=2024)
+    db_session.add_all([template, first, second])
+    db_session.flush()
+    for process in (first, second):
+        db_session.add(
+            Ficha(
+                process_id=process.id,
+                template_id=template.id,
+                campos_base_json={"tc_numero": process.tc_numero},
+                extras_json={"nota": process.process_key},
+            )
+        )
+    db_session.commit()
+
+    response = client.get("/api/v1/fichas?ano=2024", cookies=cookies)
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["total"] == 1
+    assert payload["items"][0]["process_id"] == str(second.id)
+    assert payload["items"][0]["extras_json"] == {"nota": "PROC-B"}
+
+
+def test_api_list_processes_keyset_cursor(client, db_session):
+    cookies = login(client, db_session)
+    db_session.add_all([Process(process_key=f"PROC-{index}") for index in range(5)])
+    db_session.commit()
+
+    payload = client.get("/api/v1/processos?page_size=2", cookies=cookies).json()
+    assert payload["total"] == 5
+    seen = [item["process_key"] for item in payload["items"]]
+    while payload["next_cursor"]:
+        response = client.get(f"/api/v1/processos?page_size=2&cursor={payload['next_cursor']}", cookies=cookies)
+        assert response.status_code == 200
+        payload = response.json()
+        assert payload["total"] is None
+        seen.extend(item["process_key"] for item in payload["items"])
+
+    assert sorted(seen) == [f"PROC-{index}" for index in range(5)]
+    assert len(seen) == 5
+
+    response = client.get("/api/v1/processos?cursor=nao-e-cursor", cookies=cookies)
+    assert response.status_code == 400
+
+
+def test_api_list_templates_etag(client, db_session):
+    cookies = login(client, db_session)
+    db_session.add(FichaTemplate(nome="Template Cache", descricao="", versao=1, is_active=True, schema_json={"sections": []}))
+    db_session.commit()
+
+    response = client.get("/api/v1/templates", cookies=cookies)
+    assert response.status_code == 200
+    assert [item["nome"] for item in response.json()] == ["Template Cache"]
+    etag = response.headers["etag"]
+    assert "max-age=" in response.headers["cache-control"]
+
+    cached = client.get("/api/v1/templates", cookies=cookies, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    db_session.add(FichaTemplate(nome="Template Novo", descricao="", versao=1, is_active=True, schema_json={"sections": []}))
+    db_session.commit()
+
+    refreshed = client.get("/api/v1/templates", cookies=cookies, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert len(refreshed.json()) == 2
+
+
+def test_api_create_and_get_process(client, db_session):
+    cookies = login(client, db_session)
+
+    created = client.post("/api/v1/processos", json={"process_key": "PROC-NEW", "ano": 2025}, cookies=cookies)
+    assert created.status_code == 200
+    body = created.json()
+    assert body["process_key"] == "PROC-NEW"
+
+    fetched = client.get(f"/api/v1/processos/{body['id']}", cookies=cookies)
+    assert fetched.status_code == 200
+    assert fetched.json()["ano"] == 2025
+
+
+def test_api_list_query_validation(client, db_session):
+    cookies = login(client, db_session)
+
+    assert client.get("/api/v1/processos?page_size=10000", cookies=cookies).status_code == 422
+    assert client.get("/api/v1/processos?ano=abc", cookies=cookies).status_code == 422
+    assert client.get("/api/v1/fichas?template_id=nao-uuid", cookies=cookies).status_code == 422
+    assert client.get("/api/v1/fichas?data_inicio=2024-01-01", cookies=cookies).status_code == 200
+
+
+def test_api_list_processes_total_from_window_and_past_last_page(client, db_session):
+    cookies = login(client, db_session)
+    db_session.add_all([Process(process_key=f"PROC-W{index}", ano=2020) for index in range(3)])
+    db_session.commit()
+
+    first = client.get("/api/v1/processos?ano=2020&page_size=2", cookies=cookies).json()
+    assert first["total"] == 3
+    assert len(first["items"]) == 2
+
+    beyond = client.get("/api/v1/processos?ano=2020&page=5&page_size=2", cookies=cookies).json()
+    assert beyond["items"] == []
+    assert beyond["total"] == 3
@@ -1,4 +1,6 @@
-from fichas.auth import get_password_hash
+import bcrypt
+
+from fichas.auth import clear_user_cache, get_password_hash
 from fichas.models import User
 
 
@@ -20,3 +22,43 @@ def test_login_failure(client, db_session):
     response = client.post("/login", data={"email": "admin@test.com", "password": "wrong"})
     assert response.status_code == 401
     assert "Credenciais invalidas" in response.text
+
+
+def test_session_rejected_after_token_version_bump(client, db_session):
+    user = User(email="admin@test.com", hashed_password=get_password_hash("secret"), is_admin=True)
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.post("/login", data={"email": "admin@test.com", "password": "secret"}, follow_redirects=False)
+    cookies = response.cookies
+    assert client.get("/", cookies=cookies, follow_redirects=False).status_code == 200
+
+    user.token_version += 1
+    db_session.commit()
+    clear_user_cache()
+
+    response = client.get("/", cookies=cookies, follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"].endswith("/login")
+
+
+def test_login_rehashes_legacy_bcrypt_password(client, db_session):
+    legacy_hash = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode("utf-8")
+    user = User(email="legacy@test.com", hashed_password=legacy_hash, is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.post("/login", data={"email": "legacy@test.com", "password": "secret"}, follow_redirects=False)
+    assert response.status_code == 303
+
+    db_session.refresh(user)
+    assert user.hashed_password.startswith("$argon2id$")
+
+
+def test_login_email_is_case_insensitive(client, db_session):
+    user = User(email="admin@test.com", hashed_password=get_password_hash("secret"), is_admin=True)
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.post("/login", data={"email": " Admin@Test.COM", "password": "secret"}, follow_redirects=False)
+    assert response.status_code == 303
@@ -1,7 +1,15 @@
+import io
+from datetime import date
+
 from fichas.auth import get_password_hash
-from sqlalchemy import select
+from sqlalchemy import event, select
+from starlette.datastructures import QueryParams
 
-from fichas.models import Ficha, FichaTemplate, Process, User
+from fichas.models import Attachment, Ficha, FichaTemplate, Process, User
+from fichas.routes.web import build_query, parse_date_filter
+from fichas.services.fichas_service import get_ficha
+from fichas.settings import settings
+from fichas.storage.base import StorageBackend
 
 
 def login(client, db_session):
@@ -149,3 +157,254 @@ def test_delete_ficha(client, db_session):
     db_session.expire_all()
     ficha_row = db_session.execute(select(Ficha).where(Ficha.process_id == process.id)).scalar_one_or_none()
     assert ficha_row is None
+
+
+def test_dashboard_totals(client, db_session):
+    cookies = login(client, db_session)
+
+    db_session.add_all(
+        [
+            Process(process_key="PROC-DASH-1", tc_numero="TC101", ano=2024),
+            Process(process_key="PROC-DASH-2", tc_numero="TC102", ano=2024),
+            FichaTemplate(nome="Template Dash", descricao="", versao=1, is_active=True, schema_json={"sections": []}),
+        ]
+    )
+    db_session.commit()
+
+    response = client.get("/", cookies=cookies)
+    assert response.status_code == 200
+    assert response.template.name == "dashboard.html"
+    assert response.context["processos_total"] == 2
+    assert response.context["fichas_total"] == 0
+    assert response.context["templates_total"] == 1
+
+
+def test_dashboard_caches_plain_summaries(client, db_session):
+    cookies = login(client, db_session)
+    process = Process(tc_numero="TC201", ano=2023)
+    template = FichaTemplate(nome="Template Resumo", descricao="Resumo", versao=3, is_active=True, schema_json={"sections": []})
+    db_session.add_all([process, template])
+    db_session.commit()
+    db_session.add(Ficha(process_id=process.id, template_id=template.id, campos_base_json={}, extras_json={}))
+    db_session.commit()
+
+    first = client.get("/", cookies=cookies)
+    cached = client.get("/", cookies=cookies)
+    assert cached.context["recent_fichas"] is first.context["recent_fichas"]
+    recent = cached.context["recent_fichas"][0]
+    assert not hasattr(recent, "_sa_instance_state")
+    assert (recent.template.nome, recent.template.versao) == ("Template Resumo", 3)
+    assert "TC201/2023" in cached.text
+    assert "Resumo" in cached.text
+
+
+def test_dashboard_cache_invalidated_on_create(client, db_session):
+    cookies = login(client, db_session)
+
+    first = client.get("/", cookies=cookies)
+    assert first.context["processos_total"] == 0
+
+    db_session.add(Process(process_key="PROC-DASH-3", tc_numero="TC103", ano=2024))
+    db_session.commit()
+    cached = client.get("/", cookies=cookies)
+    assert cached.context["processos_total"] == 0
+
+    response = client.post(
+        "/processos/novo",
+        data={"process_key": "PROC-DASH-4", "tc_numero": "TC104", "ano": "2024"},
+        cookies=cookies,
+        follow_redirects=False,
+    )
+    assert response.status_code == 303
+    refreshed = client.get("/", cookies=cookies)
+    assert refreshed.context["processos_total"] == 2
+
+
+def test_build_query_applies_overrides_and_drops_blanks():
+    params = QueryParams("numero=TC1&page=3&ano=&status=ativo")
+
+    assert build_query(params, page=4, template_id=None, ano="") == "numero=TC1&page=4&status=ativo"
+    assert build_query(params, template_id="abc") == "numero=TC1&page=3&status=ativo&template_id=abc"
+
+
+def test_manual_template_is_created_once(client, db_session):
+    cookies = login(client, db_session)
+
+    first = client.get("/fichas/nova", params={"manual": "1"}, cookies=cookies)
+    second = client.get("/fichas/nova", params={"manual": "1"}, cookies=cookies)
+
+    assert first.status_code == 200
+    assert second.context["template"].id == first.context["template"].id
+    manual_ids = db_session.execute(select(FichaTemplate.id).where(FichaTemplate.nome == "Cadastro manual")).all()
+    assert len(manual_ids) == 1
+
+
+def test_parse_date_filter_accepts_only_iso_dates():
+    assert parse_date_filter("2024-03-05") == date(2024, 3, 5)
+    assert parse_date_filter("2024-02-30") is None
+    assert parse_date_filter("20240305") is None
+    assert parse_date_filter("") is None
+    assert parse_date_filter(None) is None
+
+
+def test_get_ficha_loads_process_and_template_up_front(db_session):
+    process = Process(process_key="PROC-EAGER", tc_numero="TC777", ano=2024)
+    template = FichaTemplate(nome="Template Eager", descricao="", versao=1, is_active=True, schema_json={"sections": []})
+    db_session.add_all([process, template])
+    db_session.commit()
+    ficha = Ficha(process_id=process.id, template_id=template.id, campos_base_json={}, extras_json={})
+    db_session.add(ficha)
+    db_session.commit()
+    db_session.expunge_all()
+
+    loaded = get_ficha(db_session, str(ficha.id))
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        assert loaded.process.process_key == "PROC-EAGER"
+        assert loaded.template.schema_json == {"sections": []}
+        assert loaded.attachments == []
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert statements == []
+
+
+def test_attachment_upload_and_download(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr("fichas.storage._storage", None)
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "LOCAL_STORAGE_PATH", str(tmp_path))
+    cookies = login(client, db_session)
+    process = Process(process_key="PROC-ANEXO", tc_numero="TC555", ano=2024)
+    template = FichaTemplate(nome="Template Anexo", descricao="", versao=1, is_active=True, schema_json={"sections": []})
+    db_session.add_all([process, template])
+    db_session.commit()
+    ficha = Ficha(process_id=process.id, template_id=template.id, campos_base_json={}, extras_json={})
+    db_session.add(ficha)
+    db_session.commit()
+
+    response = client.post(
+        f"/fichas/{ficha.id}/anexos",
+        files={"file": ("nota.txt", b"linha 1\nlinha 2\n", "text/plain")},
+        cookies=cookies,
+        follow_redirects=False,
+    )
+    assert response.status_code == 303
+
+    attachment = db_session.execute(select(Attachment).where(Attachment.ficha_id == ficha.id)).scalar_one()
+    assert attachment.size == 16
+    download = client.get(f"/anexos/{attachment.id}", cookies=cookies)
+    assert download.status_code == 200
+    assert download.content == b"linha 1\nlinha 2\n"
+    assert download.headers["etag"] == f'"{attachment.storage_key}"'
+    assert download.headers["cache-control"] == "private, max-age=3600"
+    cached = client.get(
+        f"/anexos/{attachment.id}", headers={"If-None-Match": download.headers["etag"]}, cookies=cookies
+    )
+    assert cached.status_code == 304
+
+    missing = client.post(
+        "/fichas/nao-e-uuid/anexos",
+        files={"file": ("nota.txt", b"x", "text/plain")},
+        cookies=cookies,
+        follow_redirects=False,
+    )
+    assert missing.status_code == 303
+    assert missing.headers["location"].endswith("/fichas")
+
+
+def test_edit_forms_render_and_rerender_errors(client, db_session):
+    cookies = login(client, db_session)
+    process = Process(process_key="PROC-EDIT", tc_numero="TC444", ano=2024)
+    template = FichaTemplate(nome="Template Edit", descricao="", versao=1, is_active=True, schema_json={"sections": []})
+    db_session.add_all([process, template])
+    db_session.commit()
+    ficha = Ficha(process_id=process.id, template_id=template.id, campos_base_json={"tc_numero": "TC444"}, extras_json={})
+    db_session.add(ficha)
+    db_session.commit()
+
+    edit_page = client.get(f"/fichas/{ficha.id}/editar", cookies=cookies)
+    assert edit_page.status_code == 200
+    assert "TC444" in edit_page.text
+
+    invalid = client.post(
+        f"/fichas/{ficha.id}/editar",
+        data={"tc_numero": "TC444", "ano": "2024", "status": "desconhecido"},
+        cookies=cookies,
+    )
+    assert invalid.status_code == 400
+    assert "Status invalido" in invalid.text
+
+    template_page = client.get(f"/admin/templates/{template.id}/editar", cookies=cookies)
+    assert template_page.status_code == 200
+    assert "Template Edit" in template_page.text
+
+    template_invalid = client.post("/admin/templates/novo", data={"nome": "Novo"}, cookies=cookies)
+    assert template_invalid.status_code == 400
+
+    stale_version = client.post(
+        f"/admin/templates/{template.id}/editar",
+        data={"nome": "Template Edit", "versao": "1", "schema_text": "{"},
+        cookies=cookies,
+    )
+    assert stale_version.status_code == 400
+    assert "Versao deve ser maior que a atual" in stale_version.text
+
+
+class _MemoryStorage(StorageBackend):
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def open(self, storage_key: str):
+        return io.BytesIO(self.content)
+
+
+def test_attachment_stream_fallback_sets_length(client, db_session, monkeypatch):
+    content = b"a\n" * 1000
+    monkeypatch.setattr("fichas.routes.web.get_storage_backend", lambda: _MemoryStorage(content))
+    cookies = login(client, db_session)
+    process = Process(process_key="PROC-STREAM", tc_numero="TC333", ano=2024)
+    template = FichaTemplate(nome="Template Stream", descricao="", versao=1, is_active=True, schema_json={"sections": []})
+    db_session.add_all([process, template])
+    db_session.commit()
+    ficha = Ficha(process_id=process.id, template_id=template.id, campos_base_json={}, extras_json={})
+    db_session.add(ficha)
+    db_session.commit()
+    attachment = Attachment(
+        ficha_id=ficha.id, filename="a.txt", content_type="text/plain", size=len(content), storage_key="mem_a.txt"
+    )
+    db_session.add(attachment)
+    db_session.commit()
+
+    response = client.get(f"/anexos/{attachment.id}", cookies=cookies)
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(content))
+    assert response.headers["content-disposition"] == 'attachment; filename="a.txt"'
+    assert response.content == content
+
+
+def test_full_template_list_renders_from_cached_rows(client, db_session):
+    cookies = login(client, db_session)
+    db_session.add_all(
+        [
+            FichaTemplate(nome="Template Ativo", descricao="Desc A", versao=1, is_active=True, schema_json={"sections": []}),
+            FichaTemplate(
+                nome="Template Inativo", origem_pdf="x.pdf", versao=2, is_active=False, schema_json={"sections": []}
+            ),
+        ]
+    )
+    db_session.commit()
+
+    first = client.get("/admin/templates", cookies=cookies)
+    cached = client.get("/admin/templates", cookies=cookies)
+    for response in (first, cached):
+        assert response.status_code == 200
+        assert "Desc A" in response.text
+        assert "x.pdf" in response.text
+        assert "Inativo" in response.text
+
+    fichas = client.get("/fichas", cookies=cookies)
+    assert "Template Inativo v2" in fichas.text
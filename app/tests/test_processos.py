@@ -1,5 +1,13 @@
+import asyncio
+
+from sqlalchemy import event, func, select, text
+
+from fichas.audit import AUDIT_COPY_THRESHOLD, AuditWriter, _write_entries, audit_writer, log_action
 from fichas.auth import get_password_hash
-from fichas.models import User
+from fichas.db import AsyncSessionLocal, SessionLocal, async_engine
+from fichas.models import AuditLog, Process, User, uuid7
+from fichas.services.processos_service import create_process, get_process
+from fichas.settings import settings
 
 
 def login(client, db_session):
@@ -29,3 +37,192 @@ def test_create_process(client, db_session):
 
     list_response = client.get("/processos", cookies=cookies)
     assert "PROC-001" in list_response.text
+
+
+def test_process_list_query_params(client, db_session):
+    cookies = login(client, db_session)
+    db_session.add_all(
+        [
+            Process(process_key="PROC-2023", tc_numero="TC1", ano=2023),
+            Process(process_key="PROC-2024", tc_numero="TC2", ano=2024),
+        ]
+    )
+    db_session.commit()
+
+    response = client.get("/processos", params={"ano": "2024", "numero": "", "page": "1"}, cookies=cookies)
+    assert response.status_code == 200
+    assert "PROC-2024" in response.text
+    assert "PROC-2023" not in response.text
+    assert response.context["filters"]["ano"] == "2024"
+    assert response.context["pagination"].total == 1
+    assert response.context["pagination"].has_next is False
+
+    assert client.get("/processos", params={"page": "0"}, cookies=cookies).status_code == 422
+    assert client.get("/processos", params={"page_size": "1000"}, cookies=cookies).status_code == 422
+
+
+def test_create_process_writes_audit_log(db_session):
+    process = create_process(db_session, {"process_key": "PROC-AUDIT", "tc_numero": "TC1", "ano": 2024}, None)
+
+    entries = db_session.execute(select(AuditLog).where(AuditLog.entity_id == str(process.id))).scalars().all()
+    assert [entry.action for entry in entries] == ["create"]
+    assert entries[0].after_json["process_key"] == "PROC-AUDIT"
+
+
+def test_audit_buffer_flushes_on_commit_and_discards_on_rollback(db_session):
+    log_action(db_session, None, "update", "process", "discarded", None, {"n": 0})
+    db_session.rollback()
+
+    log_action(db_session, None, "update", "process", "batched", None, {"n": 1})
+    log_action(db_session, None, "update", "process", "batched", None, {"n": 2})
+    db_session.commit()
+
+    entries = db_session.execute(select(AuditLog).order_by(AuditLog.entity_id)).scalars().all()
+    assert [entry.entity_id for entry in entries] == ["batched", "batched"]
+    assert sorted(entry.after_json["n"] for entry in entries) == [1, 2]
+
+
+def test_process_ids_are_ordered_uuid7_stored_as_strings_on_sqlite(db_session):
+    ids = [uuid7() for _ in range(50)]
+    assert ids == sorted(ids)
+    assert all(value.version == 7 for value in ids)
+
+    process = create_process(db_session, {"process_key": "PROC-UUID"}, None)
+    raw = db_session.execute(text("SELECT id FROM processes")).scalar_one()
+    assert raw == str(process.id)
+    assert db_session.get(Process, process.id).process_key == "PROC-UUID"
+
+
+def test_large_audit_batch_skips_copy_on_async_driver(db_session, monkeypatch):
+    monkeypatch.setattr(async_engine.sync_engine.dialect, "name", "postgresql")
+    entries = [
+        {
+            "id": uuid7(),
+            "user_id": None,
+            "action": "update",
+            "entity": "process",
+            "entity_id": "bulk",
+            "before_json": None,
+            "after_json": {"n": n},
+        }
+        for n in range(AUDIT_COPY_THRESHOLD)
+    ]
+
+    async def write():
+        async with AsyncSessionLocal() as session:
+            await session.run_sync(_write_entries, entries)
+            await session.commit()
+
+    asyncio.run(write())
+
+    total = db_session.execute(select(func.count()).select_from(AuditLog).where(AuditLog.entity_id == "bulk")).scalar()
+    assert total == AUDIT_COPY_THRESHOLD
+
+
+def test_audit_copy_rows_carry_uuid7_ids(db_session, monkeypatch):
+    captured = {}
+
+    def fake_copy_rows(db, table, columns, rows):
+        captured["columns"] = columns
+        captured["rows"] = list(rows)
+
+    monkeypatch.setattr("fichas.audit.supports_copy", lambda db: True)
+    monkeypatch.setattr("fichas.audit.copy_rows", fake_copy_rows)
+    for n in range(AUDIT_COPY_THRESHOLD):
+        log_action(db_session, None, "update", "process", "copied", None, {"n": n})
+    db_session.commit()
+
+    ids = [row[captured["columns"].index("id")] for row in captured["rows"]]
+    assert len(ids) == AUDIT_COPY_THRESHOLD
+    assert all(value.version == 7 for value in ids)
+    assert ids == sorted(ids)
+
+
+def test_background_audit_writer_batches_after_commit(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_BACKGROUND_WRITES", True)
+
+    log_action(db_session, None, "update", "process", "rolled-back", None, {"n": 0})
+    db_session.rollback()
+    for n in range(3):
+        log_action(db_session, None, "update", "process", "deferred", None, {"n": n})
+    log_action(db_session, None, "delete", "ficha", "durable", None, None, durable=True)
+    db_session.commit()
+
+    audit_writer.drain()
+    entries = db_session.execute(select(AuditLog)).scalars().all()
+    assert sorted(entry.entity_id for entry in entries) == ["deferred", "deferred", "deferred", "durable"]
+
+
+def _audit_entry(entity_id):
+    return {
+        "id": uuid7(),
+        "user_id": None,
+        "action": "update",
+        "entity": "process",
+        "entity_id": entity_id,
+        "before_json": None,
+        "after_json": None,
+    }
+
+
+def test_audit_writer_retries_and_falls_back_to_single_rows(db_session):
+    calls = []
+
+    def flaky_factory():
+        calls.append(1)
+        if len(calls) <= 2:
+            raise ConnectionError("banco indisponivel")
+        return SessionLocal()
+
+    writer = AuditWriter(session_factory=flaky_factory, retry_delay=0)
+    writer.submit([_audit_entry("retried"), _audit_entry("retried")])
+    assert writer.drain(timeout=5)
+
+    bad = {**_audit_entry("invalid"), "action": None}
+    fallback = AuditWriter(retry_delay=0, interval=0.5)
+    fallback.submit([_audit_entry("kept"), bad, _audit_entry("kept")])
+    assert fallback.drain(timeout=5)
+
+    entries = db_session.execute(select(AuditLog.entity_id)).scalars().all()
+    assert sorted(entries) == ["kept", "kept", "retried", "retried"]
+    assert len(calls) == 3
+
+
+def test_audit_writer_drain_is_bounded():
+    writer = AuditWriter()
+    writer._queue.put(_audit_entry("stuck"))
+    assert writer.drain(timeout=0.05) is False
+
+
+def test_get_process_uses_identity_map(db_session):
+    process = Process(process_key="PROC-GET", tc_numero="TC9", ano=2024)
+    db_session.add(process)
+    db_session.commit()
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        assert get_process(db_session, str(process.id)) is process
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+    assert statements == []
+    assert get_process(db_session, "nao-e-uuid") is None
+
+
+def test_web_routes_redirect_anonymous_and_non_admin_users(client, db_session):
+    response = client.get("/processos", follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == "/login"
+
+    user = User(email="comum@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+    login_response = client.post("/login", data={"email": "comum@test.com", "password": "secret"}, follow_redirects=False)
+    admin_response = client.get("/admin/templates", cookies=login_response.cookies, follow_redirects=False)
+    assert admin_response.status_code == 303
+    assert admin_response.headers["location"] == "/"
@@ -1,6 +1,15 @@
-from fichas.schemas import normalize_template_schema
+from fichas.db import SessionLocal
+from fichas.schemas import build_template_field_map, normalize_template_schema
 from fichas.services.fichas_service import parse_extras
-from fichas.services.templates_service import import_template_payload
+from fichas.services.templates_service import (
+    get_template_field_map,
+    get_template_schema,
+    get_template_schema_text,
+    import_template_payload,
+    import_template_payloads,
+    list_cached_templates,
+    set_template_active,
+)
 
 
 def template_payload():
@@ -43,6 +52,71 @@ def test_import_template_payload(db_session):
 def test_parse_extras_required_field():
     payload = template_payload()
     schema = normalize_template_schema(payload)
-    extras, errors = parse_extras({}, schema)
+    extras, errors = parse_extras({}, build_template_field_map(schema))
     assert extras.get("campo_obrigatorio") is None
     assert "campo_obrigatorio" in errors
+
+
+def test_parse_extras_converts_typed_fields():
+    payload = template_payload()
+    payload["sections"][0]["fields"] = [
+        {"id": "valor", "label": "Valor", "type": "currency"},
+        {"id": "data", "label": "Data", "type": "date"},
+        {"id": "tipo", "label": "Tipo", "type": "enum", "options": ["a", "b"]},
+    ]
+    field_map = build_template_field_map(normalize_template_schema(payload))
+    form = {"extra__valor": "R$ 1.234,50", "extra__data": " 2024-02-01 ", "extra__tipo": "c"}
+    extras, errors = parse_extras(form, field_map)
+    assert extras == {"valor": 1234.5, "data": "2024-02-01"}
+    assert errors == {"tipo": "Valor invalido"}
+
+
+def test_import_template_payloads_single_transaction(db_session):
+    first = template_payload()
+    second = {**template_payload(), "nome": "Outro Draft"}
+    results = import_template_payloads(db_session, [first, second, first], user=None)
+
+    assert [created for _, created in results] == [True, True, False]
+    assert results[2][0].id == results[0][0].id
+    assert {template.nome for template, _ in results} == {"Template Draft", "Outro Draft"}
+    assert all(template.created_at is not None for template, _ in results)
+
+
+def test_template_schema_is_cached_until_replaced(db_session):
+    template, _ = import_template_payload(db_session, template_payload(), None)
+
+    schema = get_template_schema(template)
+    assert get_template_schema(template) is schema
+    assert set(get_template_field_map(template)) == {"campo_obrigatorio"}
+
+    payload = template_payload()
+    payload["sections"][0]["fields"][0]["id"] = "campo_novo"
+    replaced, changed = import_template_payload(db_session, payload, None, replace_existing=True)
+
+    assert changed
+    assert set(get_template_field_map(replaced)) == {"campo_novo"}
+    assert '"campo_novo"' in get_template_schema_text(replaced)
+
+
+def test_template_lists_cached_until_mutation(db_session):
+    template, _ = import_template_payload(db_session, template_payload(), None)
+    assert [item.id for item in list_cached_templates(db_session, active_only=True)] == [template.id]
+
+    other, _ = import_template_payload(db_session, {**template_payload(), "nome": "Outro Draft"}, None)
+    assert {item.id for item in list_cached_templates(db_session, active_only=True)} == {template.id, other.id}
+
+    set_template_active(db_session, other, False, None)
+    assert [item.id for item in list_cached_templates(db_session, active_only=True)] == [template.id]
+    assert {item.id for item in list_cached_templates(db_session)} == {template.id, other.id}
+
+
+def test_cached_template_rows_outlive_the_filling_session(db_session):
+    template, _ = import_template_payload(db_session, template_payload(), None)
+    filler = SessionLocal()
+    list_cached_templates(filler, active_only=True)
+    filler.rollback()
+    filler.close()
+
+    with SessionLocal() as reader:
+        rows = list_cached_templates(reader, active_only=True)
+    assert [(row.id, row.nome, row.versao) for row in rows] == [(template.id, "Template Draft", 1)]
@@ -1,12 +1,17 @@
+import hashlib
 import io
 
 import pytest
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import IntegrityError
 from starlette.datastructures import Headers, UploadFile
 
 from fichas.auth import get_password_hash
-from fichas.models import User
+from fichas.models import OcrJob, User
+from fichas.routes.web import _select_upload
 from fichas.services.storage import save_upload
 from fichas.settings import settings
+from fichas.storage.base import iter_chunks
 
 
 def _make_upload(content: bytes, content_type: str, filename: str) -> UploadFile:
@@ -57,3 +62,214 @@ def test_save_upload_accepts_octet_stream_image(db_session, tmp_path, monkeypatc
 
     assert document.content_type == "image/jpeg"
     assert document.storage_path.endswith(".jpg")
+
+
+def test_ocr_job_status_is_constrained(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_UPLOAD_DIR", str(tmp_path))
+
+    user = User(email="upload4@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+    document = save_upload(_make_upload(b"\xff\xd8\xff\xe0" + b"\x00" * 16, "image/jpeg", "foto.jpg"), user.id, db_session)
+
+    db_session.add(OcrJob(user_id=user.id, document_id=document.id, status="queued"))
+    db_session.commit()
+
+    db_session.add(OcrJob(user_id=user.id, document_id=document.id, status="pendente"))
+    with pytest.raises(IntegrityError):
+        db_session.commit()
+
+
+def test_ocr_job_payload_columns_are_deferred(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_UPLOAD_DIR", str(tmp_path))
+
+    user = User(email="upload5@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+    document = save_upload(_make_upload(b"\xff\xd8\xff\xe0" + b"\x00" * 16, "image/jpeg", "foto.jpg"), user.id, db_session)
+    db_session.add(
+        OcrJob(user_id=user.id, document_id=document.id, status="done", extracted_text="texto", ocr_raw_json={"a": 1})
+    )
+    db_session.commit()
+    db_session.expunge_all()
+
+    job = db_session.execute(select(OcrJob)).scalar_one()
+    assert {"extracted_text", "ocr_raw_json"} <= inspect(job).unloaded
+    assert job.status == "done"
+    assert job.extracted_text == "texto"
+
+
+def test_select_upload_uses_reported_size():
+    empty_upload = UploadFile(file=io.BytesIO(b""), size=0, headers=Headers({"content-type": "application/octet-stream"}))
+    camera_upload = UploadFile(file=io.BytesIO(b"\xff\xd8\xff"), size=3)
+
+    assert _select_upload({"upload_file": empty_upload, "camera_file": camera_upload}) is camera_upload
+    assert camera_upload.file.tell() == 0
+    assert _select_upload({"upload_file": empty_upload}) is None
+
+
+def test_iter_chunks_reads_fixed_blocks_and_closes():
+    stream = io.BytesIO(b"a\n" * 5)
+    assert list(iter_chunks(stream, chunk_size=4)) == [b"a\na\n", b"a\na\n", b"a\n"]
+    assert stream.closed
+
+
+def test_uploaded_document_is_served_with_digest_etag(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_UPLOAD_DIR", str(tmp_path))
+
+    user = User(email="upload6@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+    content = b"\xff\xd8\xff\xe0" + b"\x00" * 16
+    document = save_upload(_make_upload(content, "image/jpeg", "foto.jpg"), user.id, db_session)
+    job = OcrJob(user_id=user.id, document_id=document.id, status="done")
+    db_session.add(job)
+    db_session.commit()
+
+    assert document.size == len(content)
+    assert document.sha256 == hashlib.sha256(content).hexdigest()
+
+    login = client.post("/login", data={"email": "upload6@test.com", "password": "secret"}, follow_redirects=False)
+    response = client.get(f"/fichas/importar/{job.id}/arquivo", cookies=login.cookies)
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["etag"] == f'"{document.sha256}"'
+
+    cached = client.get(
+        f"/fichas/importar/{job.id}/arquivo",
+        headers={"If-None-Match": response.headers["etag"]},
+        cookies=login.cookies,
+    )
+    assert cached.status_code == 304
+
+    review = client.get(f"/fichas/importar/{job.id}/revisar", cookies=login.cookies)
+    assert review.status_code == 200
+    assert review.context["document"].id == document.id
+
+    confirm = client.post(
+        f"/fichas/importar/{job.id}/confirmar",
+        data={"process_id": "00000000-0000-0000-0000-000000000000"},
+        cookies=login.cookies,
+    )
+    assert confirm.status_code == 400
+    assert confirm.context["errors"]["process_id"] == "Processo invalido"
+    assert confirm.context["templates_list"] == []
+
+
+def test_ocr_status_poll_answers_not_modified(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_UPLOAD_DIR", str(tmp_path))
+
+    user = User(email="upload7@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+    document = save_upload(_make_upload(b"\xff\xd8\xff\xe0" + b"\x00" * 16, "image/jpeg", "foto.jpg"), user.id, db_session)
+    job = OcrJob(user_id=user.id, document_id=document.id, status="queued")
+    db_session.add(job)
+    db_session.commit()
+
+    login = client.post("/login", data={"email": "upload7@test.com", "password": "secret"}, follow_redirects=False)
+    response = client.get(f"/fichas/importar/{job.id}/status", cookies=login.cookies)
+    assert response.status_code == 200
+    assert "Processando" in response.text
+
+    etag = response.headers["etag"]
+    cached = client.get(f"/fichas/importar/{job.id}/status", headers={"If-None-Match": etag}, cookies=login.cookies)
+    assert cached.status_code == 304
+
+    job.status = "failed"
+    job.error_message = "Falhou"
+    db_session.commit()
+    failed = client.get(f"/fichas/importar/{job.id}/status", headers={"If-None-Match": etag}, cookies=login.cookies)
+    assert failed.status_code == 200
+    assert "Falhou" in failed.text
+
+
+def test_import_submit_enqueues_after_redirect(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_UPLOAD_DIR", str(tmp_path))
+    enqueued = []
+    monkeypatch.setattr("fichas.routes.web.enqueue_process_ocr", enqueued.append)
+
+    user = User(email="upload8@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+
+    login = client.post("/login", data={"email": "upload8@test.com", "password": "secret"}, follow_redirects=False)
+    response = client.post(
+        "/fichas/importar",
+        files={"upload_file": ("foto.jpg", io.BytesIO(b"\xff\xd8\xff\xe0" + b"\x00" * 16), "image/jpeg")},
+        cookies=login.cookies,
+        follow_redirects=False,
+    )
+    assert response.status_code == 303
+
+    job = db_session.execute(select(OcrJob)).scalar_one()
+    assert response.headers["location"] == f"/fichas/importar/{job.id}"
+    assert enqueued == [str(job.id)]
+
+
+def test_import_submit_marks_job_failed_when_enqueue_fails(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_UPLOAD_DIR", str(tmp_path))
+
+    def broken_enqueue(job_id):
+        raise ConnectionError("redis indisponivel")
+
+    monkeypatch.setattr("fichas.routes.web.enqueue_process_ocr", broken_enqueue)
+
+    user = User(email="upload10@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+
+    login = client.post("/login", data={"email": "upload10@test.com", "password": "secret"}, follow_redirects=False)
+    response = client.post(
+        "/fichas/importar",
+        files={"upload_file": ("foto.jpg", io.BytesIO(b"\xff\xd8\xff\xe0" + b"\x00" * 16), "image/jpeg")},
+        cookies=login.cookies,
+        follow_redirects=False,
+    )
+    assert response.status_code == 303
+
+    db_session.expire_all()
+    job = db_session.execute(select(OcrJob)).scalar_one()
+    assert job.status == "failed"
+    assert job.error_message == "Nao foi possivel enfileirar o OCR. Reenvie o arquivo."
+    assert job.finished_at is not None
+
+
+def test_ocr_job_json_round_trips_through_orjson(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_UPLOAD_DIR", str(tmp_path))
+
+    user = User(email="upload9@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+    document = save_upload(_make_upload(b"\xff\xd8\xff\xe0" + b"\x00" * 16, "image/jpeg", "foto.jpg"), user.id, db_session)
+    suggestions = {"base": {"interessado": "Fulano", "ano": 2024}, "extras": {"paginas": {1: "capa"}}}
+    db_session.add(OcrJob(user_id=user.id, document_id=document.id, status="done", field_suggestions_json=suggestions))
+    db_session.commit()
+    db_session.expunge_all()
+
+    job = db_session.execute(select(OcrJob)).scalar_one()
+    assert job.field_suggestions_json == {"base": {"interessado": "Fulano", "ano": 2024}, "extras": {"paginas": {"1": "capa"}}}
+
+
+def test_process_ocr_job_skips_jobs_that_are_not_queued(db_session, tmp_path, monkeypatch):
+    from fichas.workers import ocr_worker
+
+    monkeypatch.setattr(settings, "OCR_UPLOAD_DIR", str(tmp_path))
+    user = User(email="upload9@test.com", hashed_password=get_password_hash("secret"), is_admin=False)
+    db_session.add(user)
+    db_session.commit()
+    document = save_upload(_make_upload(b"%PDF-1.4\n", "application/pdf", "doc.pdf"), user.id, db_session)
+    job = OcrJob(user_id=user.id, document_id=document.id, status="done", extracted_text="original")
+    db_session.add(job)
+    db_session.commit()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("OCR should not run again")
+
+    monkeypatch.setattr(ocr_worker, "ocr_extract", fail)
+    ocr_worker.process_ocr_job(str(job.id))
+
+    db_session.expire_all()
+    reloaded = db_session.get(OcrJob, job.id)
+    assert reloaded.status == "done"
+    assert reloaded.extracted_text == "original"
@@ -8,7 +8,7 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT / "app" / "src"))
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 
 from fichas.db import SessionLocal
 from fichas.models import User
@@ -18,7 +18,7 @@ from fichas.services.templates_service import import_template_payload
 def resolve_user(db, email: str | None):
     if not email:
         return None
-    return db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+    return db.execute(select(User).where(func.lower(User.email) == email.strip().lower())).scalar_one_or_none()
 
 
 def load_json(path: Path) -> dict: